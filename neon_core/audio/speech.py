@@ -27,13 +27,14 @@ import time
 from threading import Lock
 
 from neon_core.configuration import Configuration
+from neon_core.language import shutdown_language_plugins
 from mycroft.metrics import report_timing, Stopwatch
-from mycroft.tts import TTSFactory
+from neon_core.tts import TTS, TTSFactory
 from mycroft.util import check_for_signal
 from mycroft.util.log import LOG
 from mycroft.messagebus.message import Message
 from mycroft.tts.remote_tts import RemoteTTSTimeoutException
-from mycroft.tts.mimic_tts import Mimic
+from neon_core.tts.mimic_tts import Mimic
 
 bus = None  # Mycroft messagebus connection
 config = None
@@ -121,7 +122,11 @@ def mute_and_speak(utterance, event):
 
 
     try:
-        tts.execute(utterance, event.context['ident'], listen, event)
+        if isinstance(tts, TTS):
+            tts.execute(utterance, event.context['ident'], listen, event)
+        else:
+            # mycroft and plugin engines don't take the message
+            tts.execute(utterance, event.context['ident'], listen)
     except RemoteTTSTimeoutException as e:
         LOG.error(e)
         mimic_fallback_tts(utterance, event.context['ident'], event)
@@ -193,3 +198,4 @@ def shutdown():
     if mimic_fallback_obj:
         mimic_fallback_obj.playback.stop()
         mimic_fallback_obj.playback.join()
+    shutdown_language_plugins()
@@ -22,12 +22,108 @@
 # LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
 # NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
-from os.path import join
+from os.path import getmtime
+from threading import Lock
+from time import monotonic
 from mycroft.dialog import MustacheDialogRenderer, load_dialogs
 from mycroft.util import resolve_resource_file
 from mycroft.util.log import LOG
 
 
+class DialogRegistry:
+    """
+    Process wide registry of parsed dialog templates keyed on
+    (lang, phrase). Resource files are resolved and parsed once, a file is
+    reloaded when its mtime changes, checked at most every check_interval
+    seconds so lookups in between don't touch the filesystem.
+
+    Args:
+        check_interval (float): seconds between checks for changed files
+    """
+    def __init__(self, check_interval=10):
+        self.check_interval = check_interval
+        # (lang, phrase) -> (renderer, filename, mtime, last checked)
+        self._entries = {}
+        self._lock = Lock()
+
+    def get_renderer(self, phrase, lang):
+        """
+        Get the renderer holding the templates of a phrase.
+
+        Args:
+            phrase (str): resource phrase to retrieve
+            lang (str): the language to use
+
+        Returns:
+            MustacheDialogRenderer: renderer with the phrase loaded as
+                                    template, None if there is no dialog file
+        """
+        key = (lang.lower(), phrase)
+        entry = self._entries.get(key)
+        now = monotonic()
+        if entry and now - entry[3] < self.check_interval:
+            return entry[0]
+        with self._lock:
+            filename = resolve_resource_file(
+                "text/" + key[0] + "/" + phrase + ".dialog")
+            try:
+                mtime = getmtime(filename) if filename else None
+            except OSError:
+                filename = mtime = None
+            entry = self._entries.get(key)
+            if entry and entry[1:3] == (filename, mtime):
+                renderer = entry[0]
+            elif filename:
+                renderer = MustacheDialogRenderer()
+                renderer.load_template_file(phrase, filename)
+            else:
+                LOG.debug("Resource file not found: {}".format(phrase))
+                renderer = None
+            self._entries[key] = (renderer, filename, mtime, now)
+        return renderer
+
+    def render(self, phrase, lang, context=None, index=None):
+        """
+        Render a phrase, see MustacheDialogRenderer.render
+
+        Returns:
+            str: rendered phrase, None if there is no dialog file
+        """
+        renderer = self.get_renderer(phrase, lang)
+        if not renderer:
+            return None
+        # renderers keep track of recently rendered phrases
+        with self._lock:
+            return renderer.render(phrase, context or {}, index)
+
+    def clear(self):
+        """ Forget all templates, they are reloaded on next use. """
+        with self._lock:
+            self._entries.clear()
+
+
+_registry = None
+
+
+def get_dialog_registry():
+    """
+    Get the dialog registry shared by the process, its check_interval is
+    read from the "dialog" section of the configuration.
+    """
+    global _registry
+    if _registry is None:
+        from neon_core.configuration import Configuration
+        conf = Configuration.get().get("dialog", {})
+        _registry = DialogRegistry(conf.get("check_interval", 10))
+    return _registry
+
+
+def _get_default_lang():
+    from neon_core.configuration import Configuration
+    conf = Configuration.get()
+    return conf.get("internal_lang") or conf.get("lang")
+
+
 def get(phrase, lang=None, context=None):
     """
     Looks up a resource file for the given phrase.  If no file
@@ -42,23 +138,11 @@ def get(phrase, lang=None, context=None):
     Returns:
         str: a randomized and/or translated version of the phrase
     """
-
-    if not lang:
-        from neon_core.configuration import Configuration
-        conf = Configuration.get()
-        lang = conf.get("internal_lang") or conf.get("lang")
-
-    filename = join('text', lang.lower(), phrase + '.dialog')
-    template = resolve_resource_file(filename)
-    if not template:
-        LOG.debug("Resource file not found: {}".format(filename))
+    lang = lang or _get_default_lang()
+    rendered = get_dialog_registry().render(phrase, lang, context)
+    if rendered is None:
         return phrase
-
-    stache = MustacheDialogRenderer()
-    stache.load_template_file("template", template)
-    if not context:
-        context = {}
-    return stache.render("template", context)
+    return rendered
 
 
 def get_all(phrase, lang=None, context=None):
@@ -73,25 +157,13 @@ def get_all(phrase, lang=None, context=None):
     Returns:
         [str]: Array of all the versions of the phrase
     """
-    if not lang:
-        from neon_core.configuration import Configuration
-        conf = Configuration.get()
-        lang = conf.get("internal_lang") or conf.get("lang")
-
-    filename = "text/" + lang.lower() + "/" + phrase + ".dialog"
-    template = resolve_resource_file(filename)
-    if template:
-        stache = MustacheDialogRenderer()
-        stache.load_template_file(phrase, template)
-        if phrase in stache.templates:
-            if not context:
-                context = {}
-
-            # Render all templates...
-            result = []
-            for i in range(0, len(stache.templates[phrase])):
-                result.append(stache.render("template", context, i))
-            return result
+    lang = lang or _get_default_lang()
+    registry = get_dialog_registry()
+    renderer = registry.get_renderer(phrase, lang)
+    if renderer and phrase in renderer.templates:
+        # Render all templates...
+        return [registry.render(phrase, lang, context, i)
+                for i in range(0, len(renderer.templates[phrase]))]
 
     # Use the given phrase as the template content.  Useful for
     # short phrase or single-words that can be enhanced and
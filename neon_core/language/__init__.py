@@ -25,8 +25,16 @@
 from neon_core.configuration import Configuration, get_private_keys
 from ovos_plugin_manager.language import load_lang_detect_plugin, \
     load_tx_plugin
+from neon_core.language.cache import CachedDetector, CachedTranslator, \
+    get_language_cache
+from mycroft.util.log import LOG
+from threading import Lock
+import json
 import os
 
+_shared_plugins = {}
+_shared_plugins_lock = Lock()
+
 
 def get_lang_config():
     config = Configuration.get()
@@ -80,7 +88,12 @@ class TranslatorFactory:
             clazz = TranslatorFactory.CLASSES.get(module)
 
         config["keys"] = get_private_keys()
-        return clazz(config)
+        translator = clazz(config)
+        cache_config = config.get("cache", {})
+        if cache_config.get("enabled", True):
+            translator = CachedTranslator(translator, module,
+                                          get_language_cache(cache_config))
+        return translator
 
 
 class DetectorFactory:
@@ -101,4 +114,67 @@ class DetectorFactory:
             clazz = DetectorFactory.CLASSES.get(module)
 
         config["keys"] = get_private_keys()
-        return clazz(config)
+        detector = clazz(config)
+        cache_config = config.get("cache", {})
+        if cache_config.get("enabled", True):
+            detector = CachedDetector(detector, module,
+                                      get_language_cache(cache_config))
+        return detector
+
+
+def _get_shared_plugin(factory, module_key, module=None):
+    config = Configuration.get().get("language", {})
+    module = module or config.get(module_key)
+    # private keys are injected into the config by the factories
+    config_hash = hash(json.dumps({k: v for k, v in config.items()
+                                   if k != "keys"},
+                                  sort_keys=True, default=str))
+    key = (factory.__name__, module, config_hash)
+    with _shared_plugins_lock:
+        if key not in _shared_plugins:
+            LOG.debug("Creating shared language plugin: {}".format(module))
+            _shared_plugins[key] = factory.create(module)
+        return _shared_plugins[key]
+
+
+def get_shared_detector(module=None):
+    """Get the process wide language detector for a module.
+
+    The instance is created on first use and handed to every caller
+    requesting the same module with the same language config, so skills,
+    TTS and parsers share a single plugin (and its sessions/models).
+
+    Arguments:
+        module (str): detection module, defaults to the configured one
+
+    Returns:
+        language detector plugin instance
+    """
+    return _get_shared_plugin(DetectorFactory, "detection_module", module)
+
+
+def get_shared_translator(module=None):
+    """Get the process wide translator for a module.
+
+    Arguments:
+        module (str): translation module, defaults to the configured one
+
+    Returns:
+        translator plugin instance
+    """
+    return _get_shared_plugin(TranslatorFactory, "translation_module", module)
+
+
+def shutdown_language_plugins():
+    """Shut down and forget all shared language plugin instances."""
+    with _shared_plugins_lock:
+        plugins = list(_shared_plugins.values())
+        _shared_plugins.clear()
+    for plugin in plugins:
+        for method in ("shutdown", "close"):
+            if callable(getattr(plugin, method, None)):
+                try:
+                    getattr(plugin, method)()
+                except Exception:
+                    LOG.exception("Failed to shut down language plugin")
+                break
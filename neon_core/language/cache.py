@@ -0,0 +1,246 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import json
+import sqlite3
+from collections import OrderedDict
+from os.path import join
+from threading import Lock
+from time import time
+
+from mycroft.util import get_cache_directory
+from mycroft.util.log import LOG
+
+
+class LanguageCache:
+    """LRU cache with expiring entries for language detection and
+    translation results, optionally backed by an on-disk sqlite tier.
+
+    Entries are keyed on (text, source, target, module); detections use
+    None for source and target.
+
+    Arguments:
+        max_entries (int): maximum number of entries kept in memory
+        ttl (float): seconds an entry stays valid, None to never expire
+        path (str): sqlite file for the persistent tier, None to disable it
+    """
+    def __init__(self, max_entries=10000, ttl=None, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, expiration)
+        self._lock = Lock()
+        self._db = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS cache "
+                                 "(key TEXT PRIMARY KEY, value TEXT, "
+                                 "expiration REAL)")
+                self._db.commit()
+            except sqlite3.Error:
+                LOG.exception("Failed to open language cache: " + path)
+                self._db = None
+
+    @staticmethod
+    def _key(text, source, target, module):
+        return json.dumps([text, source, target, module])
+
+    def get(self, text, source=None, target=None, module=None):
+        """Get a cached result.
+
+        Returns:
+            cached value or None on a cache miss
+        """
+        key = self._key(text, source, target, module)
+        now = time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self._entries[key]
+            entry = self._db_get(key, now)
+            if entry:
+                self._store(key, *entry)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        return None
+
+    def put(self, value, text, source=None, target=None, module=None):
+        """Cache a detection or translation result."""
+        key = self._key(text, source, target, module)
+        expiration = time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._store(key, value, expiration)
+            if self._db:
+                try:
+                    self._db.execute("INSERT OR REPLACE INTO cache "
+                                     "VALUES (?, ?, ?)",
+                                     (key, json.dumps(value), expiration))
+                    self._db.commit()
+                except sqlite3.Error:
+                    LOG.exception("Failed to persist language cache entry")
+
+    def clear(self):
+        """Remove all entries, including persisted ones."""
+        with self._lock:
+            self._entries.clear()
+            if self._db:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+
+    def stats(self):
+        """Get usage statistics of this cache.
+
+        Returns:
+            dict: entry count, limits and hit/miss counts
+        """
+        return {"entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "persistent": self._db is not None,
+                "hits": self.hits,
+                "misses": self.misses}
+
+    def _store(self, key, value, expiration):
+        self._entries[key] = (value, expiration)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _db_get(self, key, now):
+        if not self._db:
+            return None
+        try:
+            row = self._db.execute("SELECT value, expiration FROM cache "
+                                   "WHERE key=?", (key,)).fetchone()
+        except sqlite3.Error:
+            LOG.exception("Failed to read language cache")
+            return None
+        if not row:
+            return None
+        if row[1] is not None and row[1] <= now:
+            self._db.execute("DELETE FROM cache WHERE key=?", (key,))
+            self._db.commit()
+            return None
+        return json.loads(row[0]), row[1]
+
+
+class CachedDetector:
+    """Language detector plugin wrapper memoizing detect()."""
+    def __init__(self, detector, module, cache):
+        self.detector = detector
+        self.module = module
+        self.cache = cache
+
+    def detect(self, text):
+        lang = self.cache.get(text, module=self.module)
+        if lang is None:
+            lang = self.detector.detect(text)
+            self.cache.put(lang, text, module=self.module)
+        return lang
+
+    def detect_probs(self, text):
+        probs = self.cache.get(text, target="probs", module=self.module)
+        if probs is None:
+            probs = self.detector.detect_probs(text)
+            self.cache.put(probs, text, target="probs", module=self.module)
+        return probs
+
+    def __getattr__(self, item):
+        return getattr(self.detector, item)
+
+
+class CachedTranslator:
+    """Translator plugin wrapper memoizing translate().
+
+    translate_batch() is only available if the wrapped plugin implements
+    translate_batch(texts, target=None, source=None).
+    """
+    def __init__(self, translator, module, cache):
+        self.translator = translator
+        self.module = module
+        self.cache = cache
+
+    def translate(self, text, target=None, source=None):
+        translated = self.cache.get(text, source, target, self.module)
+        if translated is None:
+            translated = self.translator.translate(text, target, source)
+            self.cache.put(translated, text, source, target, self.module)
+        return translated
+
+    def _translate_batch(self, texts, target=None, source=None):
+        results = [self.cache.get(text, source, target, self.module)
+                   for text in texts]
+        missing = [text for text, result in zip(texts, results)
+                   if result is None]
+        if missing:
+            translated = iter(self.translator.translate_batch(missing, target,
+                                                              source))
+            for idx, result in enumerate(results):
+                if result is None:
+                    results[idx] = next(translated)
+                    self.cache.put(results[idx], texts[idx], source, target,
+                                   self.module)
+        return results
+
+    def __getattr__(self, item):
+        if item == "translate_batch":
+            # raises AttributeError if the plugin can't translate batches
+            getattr(self.translator, item)
+            return self._translate_batch
+        return getattr(self.translator, item)
+
+
+_cache = None
+_cache_lock = Lock()
+
+
+def get_language_cache(config=None):
+    """Get the process wide language cache.
+
+    Arguments:
+        config (dict): "cache" section of the language config, only used
+                       when the cache is first created
+
+    Returns:
+        LanguageCache: shared detection/translation cache
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = config or {}
+            path = None
+            if config.get("persistent"):
+                path = config.get("path") or \
+                    join(get_cache_directory("language"), "cache.db")
+            _cache = LanguageCache(config.get("max_entries", 10000),
+                                   config.get("ttl"), path)
+        return _cache
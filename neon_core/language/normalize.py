@@ -0,0 +1,105 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from collections import OrderedDict
+from threading import Lock
+
+from mycroft.util.lang import get_default_lang
+from mycroft.util.parse import normalize as _normalize
+
+
+class NormalizationCache:
+    """LRU memo of normalized utterances keyed on
+    (lang, remove_articles, utterance).
+
+    Arguments:
+        max_entries (int): maximum number of utterances kept
+    """
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def normalize(self, text, lang=None, remove_articles=True):
+        """Drop-in replacement for mycroft.util.parse.normalize.
+
+        Arguments:
+            text (str): utterance to normalize
+            lang (str): language of text, defaults to the default language
+            remove_articles (bool): remove articles like "a" and "the"
+
+        Returns:
+            str: normalized text
+        """
+        lang = (lang or get_default_lang()).lower()
+        key = (lang, remove_articles, text)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        normalized = _normalize(text, lang, remove_articles)
+        with self._lock:
+            self._entries[key] = normalized
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return normalized
+
+    def clear(self, max_entries=None):
+        """Remove all entries, optionally changing the cache size."""
+        with self._lock:
+            self._entries.clear()
+            if max_entries is not None:
+                self.max_entries = max_entries
+
+    def stats(self):
+        """Get usage statistics of this cache.
+
+        Returns:
+            dict: entry count, limit, hit/miss counts and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {"entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None}
+
+
+_normalization_cache = NormalizationCache()
+
+
+def get_normalization_cache():
+    """Get the normalization cache shared by the process."""
+    return _normalization_cache
+
+
+def cached_normalize(text, lang=None, remove_articles=True):
+    """Normalize text through the shared normalization cache, same
+    arguments as mycroft.util.parse.normalize."""
+    return _normalization_cache.normalize(text, lang, remove_articles)
@@ -23,8 +23,8 @@
 # NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from threading import Thread, Event
-from os.path import join, basename
+from threading import Thread, Event, Lock
+from os.path import join, basename, isdir, relpath
 import os
 import time
 import sys
@@ -33,6 +33,11 @@ from glob import glob
 import imp
 from mycroft.util.log import LOG
 
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
 DEBUG = True
 
 MainModule = '__init__'
@@ -60,15 +65,48 @@ def _get_last_modified_date(path):
     return max(os.path.getmtime(f) for f in all_files)
 
 
+class _ModuleChangeHandler:
+    """watchdog event handler collecting the modules with changed files."""
+    def __init__(self, service):
+        self.service = service
+
+    def dispatch(self, event):
+        paths = [event.src_path, getattr(event, "dest_path", None)]
+        for path in filter(None, paths):
+            parts = relpath(path, self.service.modules_dir).split(os.sep)
+            if parts[0] in ('.', '..') or \
+                    any(p.startswith('.') or p == '__pycache__'
+                        for p in parts) or \
+                    parts[-1].endswith('.pyc') or \
+                    parts[-1] == 'settings.json':
+                continue
+            self.service.notify_changed(join(self.service.modules_dir,
+                                             parts[0]))
+
+
 class ModuleLoaderService(Thread):
+    """Load modules from modules_dir and keep them up to date.
+
+    Changes are picked up through filesystem events when watchdog is
+    installed and by polling the modules every poll_interval seconds
+    otherwise. With frozen set, modules are loaded once and never checked
+    for changes again.
+    """
     def __init__(self, bus, modules_dir):
         super(ModuleLoaderService, self).__init__()
         self._stop_event = Event()
+        self._changed_event = Event()
+        self._changed = set()
+        self._changed_lock = Lock()
         self.loaded_modules = {}
         self.has_loaded = False
         self.bus = bus
         self.modules_dir = modules_dir
         self.blacklist = []
+        self.frozen = False
+        self.poll_interval = 1
+        # (module, entry) tuples ordered by priority, see _update_pipeline
+        self.pipeline = ()
 
     @staticmethod
     def load_module(module_descriptor, module_name, blacklist=None, bus=None):
@@ -123,42 +161,102 @@ class ModuleLoaderService(Thread):
         return {"path": module_path}
 
     def run(self):
+        self._scan_modules()
+        # modules are loaded synchronously, after the first scan all
+        # modules present on disk were loaded
+        self.has_loaded = True
+        if self.frozen:
+            LOG.info("Modules in {} are frozen, not watching for "
+                     "changes".format(self.modules_dir))
+        elif Observer is not None:
+            self._watch_modules()
+        else:
+            self._poll_modules()
+
+    def _scan_modules(self):
+        """ Load new or changed modules and unload removed ones. """
+        # checking modules dir and getting all modules there
+        module_paths = glob(join(self.modules_dir, '*/'))
+        still_loading = False
+        for module_path in module_paths:
+            still_loading = (
+                    self._load_module(module_path) or
+                    still_loading
+            )
+        if not self.has_loaded and not still_loading and \
+                len(module_paths) > 0:
+            self.has_loaded = True
+
+        self._unload_removed(module_paths)
+
+    def _poll_modules(self):
         # Scan the file folder that contains Parsers.  If a Parser is
         # updated, unload the existing version from memory and reload from
         # the disk.
         while not self._stop_event.is_set():
+            self._stop_event.wait(self.poll_interval)
+            self._scan_modules()
+
+    def _watch_modules(self):
+        """ Reload modules only when filesystem events report changes. """
+        observer = Observer()
+        observer.schedule(_ModuleChangeHandler(self), self.modules_dir,
+                          recursive=True)
+        observer.start()
+        try:
+            while not self._stop_event.is_set():
+                self._changed_event.wait()
+                # let a batch of file writes settle before reloading
+                time.sleep(0.5)
+                with self._changed_lock:
+                    changed = self._changed
+                    self._changed = set()
+                    self._changed_event.clear()
+                if self._stop_event.is_set():
+                    break
+                for module_path in changed:
+                    if isdir(module_path):
+                        self._load_module(module_path)
+                self._unload_removed(glob(join(self.modules_dir, '*/')))
+        finally:
+            observer.stop()
+            observer.join()
+
+    def notify_changed(self, module_path):
+        """ Mark a module as changed on disk.
 
-            # Look for recently changed module(s) needing a reload
-            # checking modules dir and getting all modules there
-            module_paths = glob(join(self.modules_dir, '*/'))
-            still_loading = False
-            for module_path in module_paths:
-                still_loading = (
-                        self._load_module(module_path) or
-                        still_loading
-                )
-            if not self.has_loaded and not still_loading and \
-                    len(module_paths) > 0:
-                self.has_loaded = True
-
-            self._unload_removed(module_paths)
-
-            time.sleep(1)  # sleep briefly
+        Args:
+            module_path: directory of the changed module
+        """
+        with self._changed_lock:
+            self._changed.add(module_path)
+            self._changed_event.set()
 
     def stop(self):
         """ Tell the manager to shutdown """
         self._stop_event.set()
+        self._changed_event.set()
 
     @property
     def modules(self):
         # return a list of modules ordered by priority
-        modules = []
-        for module in self.loaded_modules:
-            instance = self.loaded_modules[module].get("instance")
-            if instance:
-                modules.append((module, instance.priority))
-        modules = sorted(modules, key=lambda kw: kw[1])
-        return [p[0] for p in modules]
+        return [p[0] for p in self.pipeline]
+
+    def _pipeline_entry(self, module, instance):
+        """ Entry stored in the pipeline for a loaded module instance. """
+        return module, instance
+
+    def _update_pipeline(self):
+        """ Rebuild the priority ordered pipeline after modules were loaded
+        or unloaded. The pipeline is replaced in a single assignment so
+        readers never see a partially updated pipeline.
+        """
+        modules = [(module, data.get("instance"))
+                   for module, data in list(self.loaded_modules.items())
+                   if data.get("instance")]
+        modules = sorted(modules, key=lambda kw: kw[1].priority)
+        self.pipeline = tuple(self._pipeline_entry(module, instance)
+                              for module, instance in modules)
 
     def get_module(self, module):
         return self.loaded_modules[module].get("instance")
@@ -217,6 +315,7 @@ class ModuleLoaderService(Thread):
                                               blacklist=self.blacklist,
                                               bus=self.bus)
         module["last_modified"] = modified
+        self._update_pipeline()
         if module['instance'] is not None:
             return True
         return False
@@ -240,6 +339,8 @@ class ModuleLoaderService(Thread):
             except Exception as e:
                 LOG.exception(e)
             self.loaded_modules.pop(s)
+        if removed_modules:
+            self._update_pipeline()
 
     def shutdown(self):
         self.stop()
@@ -23,9 +23,50 @@
 # NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from copy import deepcopy
+from threading import Lock
+from time import monotonic
 from os.path import join, dirname
 from neon_core.processing_modules import ModuleLoaderService
 from neon_core.configuration import Configuration
+from mycroft.messagebus.message import Message
+from mycroft.util.log import LOG
+from ovos_utils.json_helper import merge_dict
+
+
+PipelineParser = namedtuple("PipelineParser",
+                            ["module", "name", "parse", "budget", "mutates"])
+
+
+class ParserLatency:
+    """ Rolling window of execution times of a single parser. """
+    def __init__(self, window=200):
+        self.times = deque(maxlen=window)
+        self.count = 0
+        self.over_budget = 0
+        self._lock = Lock()
+
+    def add(self, duration):
+        with self._lock:
+            self.times.append(duration)
+            self.count += 1
+
+    def percentile(self, percent):
+        with self._lock:
+            times = sorted(self.times)
+        if not times:
+            return None
+        return times[min(len(times) - 1,
+                         int(round(percent / 100 * (len(times) - 1))))]
+
+    def stats(self):
+        return {"count": self.count,
+                "over_budget": self.over_budget,
+                "p50": self.percentile(50),
+                "p95": self.percentile(95),
+                "p99": self.percentile(99)}
 
 
 class TextParsersService(ModuleLoaderService):
@@ -35,6 +76,149 @@ class TextParsersService(ModuleLoaderService):
         super(TextParsersService, self).__init__(bus, parsers_dir)
         self.config = Configuration.get().get("text_parsers", {})
         self.blacklist = self.config.get("blacklist", [])
+        self.frozen = self.config.get("frozen", False)
+        # "skip" or "async", what to do with a parser exceeding its budget
+        self.over_budget = self.config.get("over_budget", "async")
+        self.latency = {}
+        # pipeline grouped into stages of parsers that can run concurrently
+        self.stages = ()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config.get("workers", 4),
+            thread_name_prefix="text_parser")
+        if self.bus:
+            self.bus.on("neon.text_parsers.stats", self.handle_stats)
+
+    def _pipeline_entry(self, module, instance):
+        """ Parsers are stored with their bound parse method, their time
+        budget in seconds (text_parsers.<name>.budget) and whether they
+        modify utterances. """
+        return PipelineParser(module, instance.name, instance.parse,
+                              instance.config.get("budget"),
+                              getattr(instance, "mutates_utterances", True))
+
+    def _update_pipeline(self):
+        """ Rebuild the pipeline and group it into stages. Consecutive
+        parsers that don't modify utterances share a stage and run
+        concurrently, every other parser runs in a stage of its own. """
+        super()._update_pipeline()
+        stages = []
+        for parser in self.pipeline:
+            if not parser.mutates and stages and not stages[-1][0].mutates:
+                stages[-1].append(parser)
+            else:
+                stages.append([parser])
+        self.stages = tuple(tuple(stage) for stage in stages)
+
+    def _timed_parse(self, parser, utterances, lang):
+        start = monotonic()
+        try:
+            utterances, data = parser.parse(utterances, lang)
+        finally:
+            duration = monotonic() - start
+            self.latency.setdefault(parser.name, ParserLatency()).add(
+                duration)
+        return utterances, data, duration
+
+    def run_pipeline(self, utterances, lang, message):
+        """ Pass utterances through all parsers in priority order.
+
+        Parsers in the same stage run concurrently on the parser thread pool,
+        their data is merged into the message context in priority order.
+
+        Each parser's execution time is recorded in
+        message.context["timing"]["parsers"]. A parser not finishing within
+        its budget is skipped; with over_budget set to "async" its metadata
+        is emitted once available in a neon.text_parsers.metadata message,
+        data {"parser": <name>, "metadata": <parser data>}, with a copy of
+        the message context as it was when the budget ran out. The intent
+        is matched without it, listeners interested in late metadata (e.g.
+        a skill waiting for keywords of an utterance) find the utterance by
+        that context. A budget of 0 always runs a parser in the background.
+
+        Args:
+            utterances (list): utterances to parse
+            lang (str): language of the utterances
+            message (Message): message whose context receives parser data
+
+        Returns:
+            list: utterances as modified by the parsers
+        """
+        timing = message.context.setdefault("timing", {})
+        timing["parsers"] = parser_timing = {}
+        utterances = utterances or []
+        for stage in self.stages:
+            if len(stage) == 1 and stage[0].budget is None:
+                results = [(stage[0], self._timed_parse(stage[0], utterances,
+                                                        lang))]
+            else:
+                results = self._run_concurrently(stage, utterances, lang,
+                                                 message)
+            for parser, (parsed, data, duration) in results:
+                parser_timing[parser.name] = duration
+                if parser.mutates:
+                    utterances = parsed or []
+                # update message context with extra data
+                message.context = merge_dict(message.context, data)
+        return utterances
+
+    def _run_concurrently(self, stage, utterances, lang, message):
+        """ Run the parsers of a stage on the thread pool.
+
+        Returns:
+            list: (parser, (utterances, data, duration)) for every parser
+                  that completed within its budget, in priority order
+        """
+        start = monotonic()
+        futures = [(parser, self._executor.submit(
+            self._timed_parse, parser, list(utterances), lang))
+            for parser in stage]
+        results = []
+        for parser, future in futures:
+            timeout = None
+            if parser.budget is not None:
+                timeout = max(0, parser.budget - (monotonic() - start))
+            try:
+                results.append((parser, future.result(timeout=timeout)))
+            except TimeoutError:
+                if parser.budget:
+                    self.latency.setdefault(
+                        parser.name, ParserLatency()).over_budget += 1
+                    LOG.warning("{} exceeded its time budget of {}s".format(
+                        parser.name, parser.budget))
+                message.context["timing"]["parsers"][parser.name] = \
+                    monotonic() - start
+                if self.over_budget == "async":
+                    # the context keeps changing and is serialized by other
+                    # threads, the late message gets its own copy
+                    context = deepcopy(message.context)
+                    future.add_done_callback(
+                        lambda f, p=parser.name, c=context:
+                        self._emit_late_metadata(p, f, c))
+                else:
+                    future.cancel()
+        return results
+
+    def _emit_late_metadata(self, parser, future, context):
+        try:
+            _, data, _ = future.result()
+        except Exception as e:
+            LOG.error("{} failed: {}".format(parser, e))
+            return
+        if self.bus:
+            self.bus.emit(Message("neon.text_parsers.metadata",
+                                  {"parser": parser, "metadata": data},
+                                  context))
+
+    def handle_stats(self, message):
+        """ Reply with latency percentiles and budgets of all parsers. """
+        budgets = {p.name: p.budget for p in self.pipeline}
+        stats = {name: dict(latency.stats(), budget=budgets.get(name))
+                 for name, latency in list(self.latency.items())}
+        self.bus.emit(message.response({"parsers": stats}))
+
+    def shutdown(self):
+        super().shutdown()
+        self._executor.shutdown(wait=False)
 
     def parse(self, parser, utterances=None, lang="en-us"):
         utterances = utterances or []
@@ -46,6 +230,10 @@ class TextParsersService(ModuleLoaderService):
 
 
 class TextParser:
+    # parsers that only add metadata set this to False, consecutive
+    # non-mutating parsers are run concurrently
+    mutates_utterances = True
+
     def __init__(self, name="test_parser", priority=50):
         self.name = name
         self.bus = None
@@ -26,16 +26,65 @@ from neon_core.processing_modules.text import TextParser
 from neon_core import dialog
 
 
+class SuffixMatcher:
+    """ Reversed trie of phrases, finds which phrases an utterance ends with
+    in O(len(utterance)). """
+    def __init__(self, phrases):
+        self.root = {}
+        for priority, phrase in enumerate(phrases):
+            node = self.root
+            for char in reversed(phrase):
+                node = node.setdefault(char, {})
+            # keep the first occurrence of duplicated phrases
+            node.setdefault(None, (priority, phrase))
+
+    def match(self, utterance):
+        """ Get the phrase utterance ends with, phrases listed first win.
+
+        Returns:
+            tuple: (priority, phrase) or None if no phrase matches
+        """
+        best = None
+        node = self.root
+        for char in reversed(utterance):
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(None)
+            if found and (best is None or found < best):
+                best = found
+        # the empty phrase matches any utterance
+        found = self.root.get(None)
+        if found and (best is None or found < best):
+            best = found
+        return best
+
+
 class Nevermind(TextParser):
     def __init__(self, name="utterance_cancel", priority=15):
         super().__init__(name, priority)
+        self._matchers = {}  # lang -> (dialog renderer, matcher)
+
+    def _get_matcher(self, lang):
+        """ Get the cancel phrase matcher of a language, rebuilt when the
+        dialog registry reloaded cancel.dialog. """
+        renderer = dialog.get_dialog_registry().get_renderer("cancel", lang)
+        entry = self._matchers.get(lang)
+        if entry and entry[0] is renderer:
+            return entry[1]
+        matcher = SuffixMatcher(dialog.get_all("cancel", lang))
+        self._matchers[lang] = (renderer, matcher)
+        return matcher
 
     def parse(self, utterances, lang="en-us"):
-        cancel_words = dialog.get_all("cancel", lang)
-        for nevermind in cancel_words:
-            for utterance in utterances:
-                if utterance.endswith(nevermind):
-                    return [], {"canceled": True, "cancel_word": nevermind}
+        matcher = self._get_matcher(lang)
+        best = None
+        for utterance in utterances:
+            found = matcher.match(utterance)
+            if found and (best is None or found < best):
+                best = found
+        if best:
+            return [], {"canceled": True, "cancel_word": best[1]}
 
         return utterances, {}
 
@@ -28,21 +28,56 @@
 # might be useful to tag entities in the future
 # check https://github.com/OpenJarbas/simple_NER
 
+from threading import Lock
 from RAKEkeywords import Rake
 from neon_core.processing_modules.text import TextParser
 
 
 class EntityTagger(TextParser):
+    mutates_utterances = False
+
     def __init__(self, name="keyword_tagger", priority=99):
         super().__init__(name, priority)
+        # skip utterance alternatives that only differ in case or whitespace
+        self.dedupe = self.config.get("dedupe", True)
+        self._extractors = {}
+        self._lock = Lock()
 
-    def parse(self, utterances, lang="en-us"):
+    def get_extractor(self, lang):
+        """ Get the keyword extractor of a language, stopwords are loaded
+        and regexes compiled once per language. """
+        extractor = self._extractors.get(lang)
+        if extractor is None:
+            with self._lock:
+                extractor = self._extractors.get(lang)
+                if extractor is None:
+                    extractor = self._extractors[lang] = Rake(lang)
+        return extractor
+
+    def extract_keywords(self, utterances, lang="en-us"):
+        """ Extract keywords of all utterances with a single extractor.
+
+        Args:
+            utterances (list): utterances to extract keywords from
+            lang (str): language of the utterances
+
+        Returns:
+            list: keywords of all utterances, in utterance order
+        """
+        rake = self.get_extractor(lang)
         keywords = []
+        seen = set()
         for utterance in utterances:
-            # extract keywords
-            rake = Rake(lang)
+            if self.dedupe:
+                key = " ".join(utterance.lower().split())
+                if key in seen:
+                    continue
+                seen.add(key)
             keywords += rake.extract_keywords(utterance)
+        return keywords
 
+    def parse(self, utterances, lang="en-us"):
+        keywords = self.extract_keywords(utterances, lang)
         # return unchanged utterances + data
         return utterances, {"keywords": keywords}
 
@@ -23,8 +23,10 @@
 # NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from concurrent.futures import ThreadPoolExecutor
 from neon_core.processing_modules.text import TextParser
-from neon_core.language import DetectorFactory, TranslatorFactory, get_lang_config
+from neon_core.language import get_shared_detector, \
+    get_shared_translator, get_lang_config
 from mycroft.util.log import LOG
 
 
@@ -32,31 +34,106 @@ class UtteranceTranslator(TextParser):
     def __init__(self, name="utterance_translator", priority=5):
         super().__init__(name, priority)
         self.language_config = get_lang_config()
-        self.lang_detector = DetectorFactory.create()
-        self.translator = TranslatorFactory.create()
+        self.lang_detector = get_shared_detector()
+        self.translator = get_shared_translator()
+        # detection of the longest alternative is used for all alternatives
+        # if at least this confident, else each alternative is detected
+        self.min_confidence = self.config.get("min_confidence", 0.8)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config.get("workers", 4),
+            thread_name_prefix="utterance_translator")
 
-    def parse(self, utterances, lang="en-us"):
-        metadata = []
-        for idx, ut in enumerate(utterances):
+    def detect(self, utterances):
+        """ Detect the language of utterance alternatives.
+
+        Args:
+            utterances (list): alternatives of a single utterance
+
+        Returns:
+            list: detected language of each utterance, None where detection
+                  failed
+        """
+        try:
+            probs = self.lang_detector.detect_probs(max(utterances, key=len))
+            lang, confidence = max(probs.items(), key=lambda p: p[1])
+        except Exception as e:
+            LOG.error(e)
+            lang, confidence = None, 0
+        if confidence >= self.min_confidence:
+            return [lang] * len(utterances)
+        LOG.debug("Low confidence detection ({}: {}), detecting each "
+                  "utterance".format(lang, confidence))
+        return [self._detect(ut) for ut in utterances]
+
+    def _detect(self, utterance):
+        try:
+            return self.lang_detector.detect(utterance)
+        except Exception as e:
+            LOG.error(e)
+            return None
+
+    def translate(self, utterances, target):
+        """ Translate utterances with a single batch call if the translator
+        supports it, else concurrently. Duplicates are translated once.
+
+        Returns:
+            dict: utterance -> translation, utterances that failed to
+                  translate are left out
+        """
+        unique = list(dict.fromkeys(utterances))
+        batch = getattr(self.translator, "translate_batch", None)
+        if batch:
             try:
-                original = ut
-                detected_lang = self.lang_detector.detect(original)
-                LOG.debug("Detected language: {lang}".format(lang=detected_lang))
-                if detected_lang != self.language_config["internal"].split("-")[0]:
-                    utterances[idx] = self.translator.translate(original,
-                                                                self.language_config["internal"])
-                # add language metadata to context
-                metadata += [{
-                    "source_lang": lang,
-                    "detected_lang": detected_lang,
-                    "internal": self.language_config["internal"],
-                    "was_translated": detected_lang != self.language_config["internal"].split("-")[0],
-                    "raw_utterance": original
-                }]
+                return dict(zip(unique, batch(unique, target)))
             except Exception as e:
-                LOG.error(e)
+                LOG.error("Batch translation failed ({}), translating each "
+                          "utterance".format(e))
+        if len(unique) == 1:
+            translated = [self._translate(unique[0], target)]
+        else:
+            translated = self._executor.map(
+                lambda ut: self._translate(ut, target), unique)
+        return {ut: tx for ut, tx in zip(unique, translated)
+                if tx is not None}
+
+    def _translate(self, utterance, target):
+        try:
+            return self.translator.translate(utterance, target)
+        except Exception as e:
+            LOG.error(e)
+            return None
+
+    def parse(self, utterances, lang="en-us"):
+        if not utterances:
+            return utterances, {"translation_data": []}
+        internal = self.language_config["internal"]
+        detected = self.detect(utterances)
+        for detected_lang in set(detected):
+            LOG.debug("Detected language: {lang}".format(lang=detected_lang))
+        # alternatives whose language couldn't be detected are kept as is
+        to_translate = [ut for ut, detected_lang in zip(utterances, detected)
+                        if detected_lang not in (None, internal.split("-")[0])]
+        translations = self.translate(to_translate, internal) \
+            if to_translate else {}
+
+        metadata = []
+        translated = []
+        for original, detected_lang in zip(utterances, detected):
+            was_translated = original in translations
+            translated.append(translations.get(original, original))
+            # add language metadata to context
+            metadata += [{
+                "source_lang": lang,
+                "detected_lang": detected_lang,
+                "internal": internal,
+                "was_translated": was_translated,
+                "raw_utterance": original
+            }]
         # return translated utterances + data
-        return utterances, {"translation_data": metadata}
+        return translated, {"translation_data": metadata}
+
+    def default_shutdown(self):
+        self._executor.shutdown(wait=False)
 
 
 def create_module():
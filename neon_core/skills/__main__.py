@@ -39,6 +39,7 @@ from mycroft.skills.skill_manager import SkillManager
 from mycroft.skills.msm_wrapper import MsmException
 from neon_core.skills.skill_manager import NeonSkillManager
 from neon_core.skills.intent_service import NeonIntentService
+from neon_core.language import shutdown_language_plugins
 
 
 def on_started():
@@ -154,6 +155,7 @@ def shutdown(skill_manager, event_scheduler):
     if skill_manager is not None:
         skill_manager.stop()
         skill_manager.join()
+    shutdown_language_plugins()
     LOG.info('Skills service shutdown complete!')
 
 
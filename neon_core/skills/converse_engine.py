@@ -0,0 +1,182 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""Converse intents of all skills in a single padatious container, so an
+utterance is scored once for all active skills instead of once per skill"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from os.path import expanduser, join
+from threading import Lock
+
+from padatious import IntentContainer
+from mycroft.util.log import LOG
+
+
+class ConverseIntentEngine:
+    """Shared padatious container holding the converse intents of all
+    skills, intent names are namespaced "<skill_id>.converse:<file>".
+
+    Training builds a new container in the background while the current
+    one keeps answering, the trained container then replaces it.
+
+    Arguments:
+        cache_dir (str): padatious cache directory
+        memo_size (int): number of recent utterances whose scores are kept
+    """
+    def __init__(self, cache_dir, memo_size=16):
+        self.cache_dir = cache_dir
+        self.memo_size = memo_size
+        self.container = None  # trained container used for matching
+        self._intents = {}  # intent name -> intent file
+        self._scores = OrderedDict()  # utterances -> {intent: MatchData}
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="converse_engine")
+        self._training = None
+        self._retrain = False
+
+    @staticmethod
+    def _prefix(skill_id):
+        return '{}.converse:'.format(skill_id)
+
+    @property
+    def training(self):
+        """True while a new container is being trained."""
+        return self._training is not None
+
+    def register_intent(self, name, filename):
+        """Add a converse intent, train() must be called afterwards."""
+        with self._lock:
+            self._intents[name] = filename
+
+    def remove_skill(self, skill_id):
+        """Remove all converse intents of a skill."""
+        prefix = self._prefix(skill_id)
+        with self._lock:
+            names = [name for name in self._intents
+                     if name.startswith(prefix)]
+            for name in names:
+                self._intents.pop(name)
+        if names:
+            self.train()
+
+    def train(self):
+        """Train a container with the current intents in the background,
+        requests made while training run in a single follow-up training."""
+        with self._lock:
+            if self.training:
+                self._retrain = True
+                return
+            self._training = self._executor.submit(self._train)
+
+    def _train(self):
+        while True:
+            with self._lock:
+                self._retrain = False
+                intents = dict(self._intents)
+            try:
+                container = self._build_container(intents)
+            except Exception:
+                LOG.exception("Failed to train converse intents")
+                container = None
+            with self._lock:
+                if container is not None:
+                    self.container = container
+                    self._scores.clear()
+                if not self._retrain:
+                    # cleared under the lock, so a train() call from now on
+                    # starts a new training instead of a lost follow-up
+                    self._training = None
+                    return
+
+    def _build_container(self, intents):
+        """Train a container with the given intents, unchanged intents are
+        loaded from the padatious cache."""
+        container = IntentContainer(self.cache_dir)
+        for name, filename in intents.items():
+            container.load_intent(name, filename)
+        try:
+            container.train_subprocess(single_thread=True)
+        except Exception as e:
+            LOG.warning("Converse intent training subprocess failed "
+                        "({}), training in process".format(e))
+            container.train(single_thread=True)
+        return container
+
+    def calc_intent(self, skill_id, utterances):
+        """Get the best converse intent match of a skill.
+
+        Utterances are scored against the intents of all skills at once,
+        the scores are kept so other skills asked about the same utterances
+        reuse them.
+
+        Arguments:
+            skill_id (str): skill to get a match for
+            utterances (list): utterances to score
+
+        Returns:
+            MatchData: best match of the skill, None before the first
+                       training or if none of its intents match
+        """
+        key = tuple(utterances)
+        with self._lock:
+            if self.container is None:
+                return None
+            scores = self._scores.get(key)
+            if scores is None:
+                scores = {}
+                for utt in utterances:
+                    for match in self.container.calc_intents(utt):
+                        best = scores.get(match.name)
+                        if not best or match.conf > best.conf:
+                            scores[match.name] = match
+                self._scores[key] = scores
+                while len(self._scores) > self.memo_size:
+                    self._scores.popitem(last=False)
+            else:
+                self._scores.move_to_end(key)
+        prefix = self._prefix(skill_id)
+        matches = [m for name, m in scores.items() if name.startswith(prefix)]
+        return max(matches, key=lambda m: m.conf) if matches else None
+
+
+_engine = None
+_engine_lock = Lock()
+
+
+def get_converse_engine():
+    """Get the shared converse intent engine, None unless enabled with
+    skills.shared_converse_engine."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            from neon_core.configuration import Configuration
+            config = Configuration.get()
+            if not config.get("skills", {}).get("shared_converse_engine"):
+                return None
+            cache_dir = join(expanduser(config.get("padatious", {}).get(
+                "intent_cache", "~/.local/share/neon/intent_cache")),
+                "converse")
+            _engine = ConverseIntentEngine(cache_dir)
+        return _engine
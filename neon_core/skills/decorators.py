@@ -23,14 +23,15 @@
 # NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """Decorators for use with MycroftSkill methods"""
+import ctypes
+from collections import deque
 from functools import wraps
 import threading
 from inspect import signature
-import time
 from mycroft.messagebus import Message
 from mycroft.skills.mycroft_skill.decorators import intent_handler, \
     intent_file_handler, resting_screen_handler, skill_api_method
-from ovos_utils import create_killable_daemon
+from mycroft.util.log import LOG
 
 
 class AbortEvent(StopIteration):
@@ -45,6 +46,283 @@ class AbortQuestion(AbortEvent):
     """ gracefully abort get_response queries """
 
 
+def _async_raise(thread_id, exc):
+    """ raise exc in the thread with the given id """
+    res = ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread_id), ctypes.py_object(exc))
+    if res > 1:
+        # undo, more than one thread was affected
+        ctypes.pythonapi.PyThreadState_SetAsyncExc(
+            ctypes.c_ulong(thread_id), None)
+
+
+class CancellationToken:
+    """ Cooperative cancellation of a killable handler.
+
+    Long running handlers should check it regularly, a handler that doesn't
+    stop within the abort grace period gets exc raised in its thread.
+    """
+    def __init__(self, exc=AbortEvent):
+        self.exc = exc
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+    def wait(self, timeout=None):
+        """ sleep for up to timeout seconds, True if cancelled meanwhile """
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise self.exc()
+
+
+_current = threading.local()
+
+
+def get_killable_task():
+    """ Get the killable handler running in the calling thread, None
+    outside of killable handlers """
+    return getattr(_current, "task", None)
+
+
+def get_cancellation_token():
+    """ Get the cancellation token of the killable handler running in the
+    calling thread, None outside of killable handlers """
+    task = get_killable_task()
+    return task.token if task else None
+
+
+class KillableTask:
+    """ A killable handler call, queued on or running in a
+    KillableWorkerPool. Provides the thread methods previously returned by
+    killable_event (is_alive, join, kill). """
+    def __init__(self, func, args, kwargs, skill_id, exc, pool):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.skill_id = skill_id
+        self.exc = exc
+        self.pool = pool
+        self.token = CancellationToken(exc)
+        self.state = "queued"
+        self._done = threading.Event()
+        self._done_callbacks = []
+        self._thread_id = None
+        self._lock = threading.Lock()
+
+    def is_alive(self):
+        return not self._done.is_set()
+
+    def join(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, callback):
+        """ call callback(task) once the task finished or was aborted """
+        with self._lock:
+            if not self._done.is_set():
+                self._done_callbacks.append(callback)
+                return
+        callback(self)
+
+    def run(self):
+        with self._lock:
+            if self.token.cancelled:
+                self.state = "aborted"
+                return
+            self.state = "running"
+            self._thread_id = threading.get_ident()
+        _current.task = self
+        try:
+            self.func(*self.args, **self.kwargs)
+            # handlers noticing their cancellation return by themselves
+            self.state = "aborted" if self.token.cancelled else "completed"
+        except AbortEvent:
+            self.state = "aborted"
+        except Exception:
+            self.state = "failed"
+            LOG.exception("killable handler failed")
+        finally:
+            with self._lock:
+                self._thread_id = None
+            _current.task = None
+
+    def finish(self):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self._thread_id = None
+            self._done.set()
+            callbacks, self._done_callbacks = self._done_callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                LOG.exception("killable task callback failed")
+
+    def abort(self, grace=None):
+        """ Cancel the task and wait for it to stop.
+
+        Queued tasks are dropped, running tasks get grace seconds to notice
+        their cancellation token before exc is raised in their thread.
+        """
+        self.token.cancel()
+        if self.pool.discard(self):
+            return
+        grace = self.pool.abort_grace if grace is None else grace
+        if self._done.wait(grace):
+            return
+        while not self._done.is_set():
+            with self._lock:
+                if self._thread_id is not None:
+                    _async_raise(self._thread_id, self.exc)
+            self._done.wait(0.1)
+
+    def kill(self):
+        self.abort(grace=0)
+
+
+class KillableWorkerPool:
+    """ Bounded pool of reusable threads running killable handlers.
+
+    Arguments:
+        max_workers (int): maximum number of worker threads
+        per_skill (int): maximum number of handlers of one skill running at
+                         once, further calls are queued
+        abort_grace (float): seconds an aborted handler has to stop by
+                             itself before exceptions are raised in it
+    """
+    def __init__(self, max_workers=16, per_skill=4, abort_grace=0.25):
+        self.max_workers = max_workers
+        self.per_skill = per_skill
+        self.abort_grace = abort_grace
+        self._ready = deque()
+        self._waiting = {}  # skill_id -> deque of tasks over the skill limit
+        self._running = {}  # skill_id -> number of running tasks
+        self._stats = {}  # skill_id -> {state: count}
+        self._workers = 0
+        self._idle = 0
+        self._cond = threading.Condition()
+
+    def submit(self, func, args, kwargs, skill_id, exc=AbortEvent):
+        """ Queue a handler call.
+
+        Returns:
+            KillableTask: the queued call
+        """
+        task = KillableTask(func, args, kwargs, skill_id, exc, self)
+        with self._cond:
+            self._stats.setdefault(skill_id, {})
+            if self._running.get(skill_id, 0) < self.per_skill:
+                self._running[skill_id] = self._running.get(skill_id, 0) + 1
+                self._ready.append(task)
+                self._add_workers()
+                self._cond.notify()
+            else:
+                self._waiting.setdefault(skill_id, deque()).append(task)
+        return task
+
+    def discard(self, task):
+        """ Remove a task that didn't start yet, True if it was removed """
+        with self._cond:
+            if task.state != "queued":
+                return False
+            if task in self._ready:
+                self._ready.remove(task)
+                self._release(task.skill_id)
+            elif task in self._waiting.get(task.skill_id, ()):
+                self._waiting[task.skill_id].remove(task)
+            else:
+                return False
+            task.state = "aborted"
+            self._count(task.skill_id, "aborted")
+        task.finish()
+        return True
+
+    def stats(self):
+        """ Get handler counts per skill, current ("queued", "running") and
+        cumulative ("completed", "aborted", "failed") """
+        with self._cond:
+            stats = {}
+            for skill_id, counts in self._stats.items():
+                waiting = len(self._waiting.get(skill_id, ()))
+                ready = sum(1 for t in self._ready if t.skill_id == skill_id)
+                running = self._running.get(skill_id, 0) - ready
+                stats[skill_id] = dict(counts, queued=waiting + ready,
+                                       running=running)
+            return {"workers": self._workers, "idle": self._idle,
+                    "skills": stats}
+
+    def _count(self, skill_id, state):
+        counts = self._stats.setdefault(skill_id, {})
+        counts[state] = counts.get(state, 0) + 1
+
+    def _add_workers(self):
+        """ start workers until every ready task has an idle worker, new
+        workers count as idle until they take a task;
+        call with self._cond held """
+        while len(self._ready) > self._idle and \
+                self._workers < self.max_workers:
+            self._workers += 1
+            self._idle += 1
+            threading.Thread(target=self._work, daemon=True,
+                             name="killable_worker").start()
+
+    def _release(self, skill_id):
+        """ free a running slot of a skill, starting its next waiting task;
+        call with self._cond held """
+        waiting = self._waiting.get(skill_id)
+        if waiting:
+            self._ready.append(waiting.popleft())
+            self._add_workers()
+            self._cond.notify()
+        else:
+            self._running[skill_id] -= 1
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._ready:
+                    self._cond.wait()
+                self._idle -= 1
+                task = self._ready.popleft()
+            try:
+                task.run()
+            except BaseException as e:
+                # abort exception delivered after the handler returned
+                if not isinstance(e, AbortEvent):
+                    LOG.exception(e)
+            with self._cond:
+                self._idle += 1
+                self._release(task.skill_id)
+                self._count(task.skill_id, task.state)
+            task.finish()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_killable_pool():
+    """ Get the worker pool running killable handlers of this process,
+    configured by skills.killable_handlers """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from neon_core.configuration import Configuration
+            config = Configuration.get().get("skills", {}).get(
+                "killable_handlers", {})
+            _pool = KillableWorkerPool(config.get("workers", 16),
+                                       config.get("per_skill", 4),
+                                       config.get("abort_grace", 0.25))
+        return _pool
+
+
 def killable_intent(msg="mycroft.skills.abort_execution",
                     callback=None, react_to_stop=True, call_stop=True,
                     stop_tts=True):
@@ -61,10 +339,11 @@ def killable_event(msg="mycroft.skills.abort_execution", exc=AbortEvent,
         @wraps(func)
         def call_function(*args, **kwargs):
             skill = args[0]
-            t = create_killable_daemon(func, args, kwargs, autostart=False)
+            task = get_killable_pool().submit(func, args, kwargs,
+                                              skill.skill_id, exc)
 
             def abort(_):
-                if not t.is_alive():
+                if not task.is_alive():
                     return
                 if stop_tts:
                     skill.bus.emit(Message("mycroft.audio.speech.stop"))
@@ -72,19 +351,12 @@ def killable_event(msg="mycroft.skills.abort_execution", exc=AbortEvent,
                     # call stop on parent skill
                     skill.stop()
 
-                # ensure no orphan get_response daemons
-                # this is the only killable daemon that core itself will
+                # ensure no orphan get_response queries
+                # this is the only killable handler that core itself will
                 # create, users should also account for this condition with
                 # callbacks if using the decorator for other purposes
-                skill._handle_killed_wait_response()
-                try:
-                    while t.is_alive():
-                        t.raise_exc(exc)
-                        time.sleep(0.1)
-                except threading.ThreadError:
-                    pass  # already killed
-                except AssertionError:
-                    pass  # could not determine thread id ?
+                skill._handle_killed_wait_response(task)
+                task.abort()
                 if callback is not None:
                     if len(signature(callback).parameters) == 1:
                         # class method, needs self
@@ -92,13 +364,22 @@ def killable_event(msg="mycroft.skills.abort_execution", exc=AbortEvent,
                     else:
                         callback()
 
-            # save reference to threads so they can be killed later
-            skill._threads.append(t)
-            skill.bus.once(msg, abort)
+            def cleanup(_):
+                skill.bus.remove(msg, abort)
+                if react_to_stop:
+                    skill.bus.remove(skill.skill_id + ".stop", abort)
+                try:
+                    skill._threads.remove(task)
+                except ValueError:
+                    pass
+
+            # save reference to running handlers so they can be killed later
+            skill._threads.append(task)
+            skill.bus.on(msg, abort)
             if react_to_stop:
-                skill.bus.once(args[0].skill_id + ".stop", abort)
-            t.start()
-            return t
+                skill.bus.on(skill.skill_id + ".stop", abort)
+            task.add_done_callback(cleanup)
+            return task
 
         return call_function
 
@@ -1,22 +1,59 @@
 import time
-from copy import copy
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import copy, deepcopy
+from threading import Event, Lock, local
 
 from mycroft.metrics import Stopwatch
 
 from neon_core.configuration import Configuration
 from mycroft.messagebus.message import Message
 from mycroft.util.log import LOG
-from mycroft.util.parse import normalize
 from mycroft.skills.intent_service import IntentService
+from mycroft.skills.permissions import ConverseMode
+import mycroft.skills.intent_service as mycroft_intent_service
 
 from neon_core.language import get_lang_config
+from neon_core.language.normalize import cached_normalize, \
+    get_normalization_cache
 from neon_core.processing_modules.text import TextParsersService
 from mycroft.configuration import setup_locale
-from ovos_utils.json_helper import merge_dict
+from neon_core.skills.sessions import DEFAULT_SESSION, SessionDispatcher, \
+    SessionState, get_session_id
+from neon_utils.configuration_utils import get_neon_device_type
+
+# language of the utterance handled by the current thread
+_handler = local()
+
+
+def _normalize(text, lang=None, remove_articles=True):
+    """IntentService.handle_utterance normalizes the utterances again
+    without a language, use the shared normalization cache with the
+    language of the utterance this thread handles."""
+    return cached_normalize(text, lang or getattr(_handler, "lang", None),
+                            remove_articles)
+
+
+def _set_handler_lang(lang):
+    """Replaces set_default_lang in IntentService with concurrent sessions,
+    the language is kept for the handling thread instead of changing the
+    process wide default under other sessions."""
+    _handler.lang = lang
+
+
+mycroft_intent_service.normalize = _normalize
 
 
 class NeonIntentService(IntentService):
     def __init__(self, bus):
+        # active skills and converse state are kept per session, they must
+        # exist before IntentService.__init__ initializes active_skills
+        self._sessions = {}
+        self._sessions_lock = Lock()
+        self._session_local = local()
+        intent_config = Configuration.get().get("intents", {})
+        self.session_key = intent_config.get("session_key", "session")
+        self.session_timeout = intent_config.get("session_timeout", 3600)
         super().__init__(bus)
         self.config = Configuration.get().get('context', {})
         self.language_config = get_lang_config()
@@ -28,6 +65,99 @@ class NeonIntentService(IntentService):
         self.parser_service = TextParsersService(self.bus)
         self.parser_service.start()
 
+        self._batch_executor = ThreadPoolExecutor(
+            max_workers=intent_config.get("batch_workers", 4),
+            thread_name_prefix="utterance_batch")
+        self.bus.on('recognizer_loop:utterance.batch',
+                    self.handle_utterance_batch)
+
+        get_normalization_cache().clear(
+            self.language_config.get("normalize_cache_size", 2048))
+        self.bus.on('neon.normalization.cache.stats',
+                    self.handle_normalization_stats)
+        self.bus.on('configuration.updated', self.handle_config_updated)
+
+        concurrent = intent_config.get("concurrent_sessions")
+        if concurrent is None:
+            concurrent = get_neon_device_type() == "server"
+        self._session_dispatcher = SessionDispatcher(
+            max_workers=intent_config.get("session_workers", 8),
+            thread_name_prefix="intent_session") if concurrent else None
+        if concurrent:
+            # handlers of different sessions must not change the
+            # process wide default language and timezone
+            mycroft_intent_service.set_default_lang = _set_handler_lang
+            mycroft_intent_service.set_default_tz = lambda tz=None: None
+
+    def handle_normalization_stats(self, message):
+        """Reply with hit rate and size of the normalization cache"""
+        self.bus.emit(message.response(get_normalization_cache().stats()))
+
+    def handle_config_updated(self, _):
+        """Drop cached normalizations, they depend on language settings"""
+        self.language_config = get_lang_config()
+        get_normalization_cache().clear(
+            self.language_config.get("normalize_cache_size", 2048))
+
+    @property
+    def active_skills(self):
+        """Active skills of the session being handled"""
+        return self._get_session().active_skills
+
+    @active_skills.setter
+    def active_skills(self, skills):
+        self._get_session().active_skills = skills
+
+    @property
+    def _consecutive_activations(self):
+        return self._get_session().consecutive_activations
+
+    @_consecutive_activations.setter
+    def _consecutive_activations(self, activations):
+        self._get_session().consecutive_activations = activations
+
+    def _get_session(self, session_id=None):
+        """Get the state of a session, created if it doesn't exist yet.
+
+        Arguments:
+            session_id (str): session to get, defaults to the session of the
+                              message handled by the calling thread
+        """
+        session_id = session_id or getattr(self._session_local,
+                                           "session_id", None) or \
+            DEFAULT_SESSION
+        with self._sessions_lock:
+            session = self._sessions.get(session_id)
+            if not session:
+                self._prune_sessions()
+                session = self._sessions[session_id] = \
+                    SessionState(session_id)
+            session.last_used = time.time()
+            return session
+
+    def _prune_sessions(self):
+        """Forget sessions that have been idle for session_timeout"""
+        expired = time.time() - self.session_timeout
+        for session_id, session in list(self._sessions.items()):
+            if session_id != DEFAULT_SESSION and session.last_used < expired:
+                self._sessions.pop(session_id)
+
+    @contextmanager
+    def _session_scope(self, message):
+        """Make the session of message the one handled by this thread.
+
+        Messages emitted by skills forward the context of the utterance they
+        handle, so converse (de)activation targets the session of the user
+        who spoke to the skill.
+        """
+        previous = getattr(self._session_local, "session_id", None)
+        self._session_local.session_id = get_session_id(message,
+                                                        self.session_key)
+        try:
+            yield
+        finally:
+            self._session_local.session_id = previous
+
     def _setup_converse_handlers(self):
         self.bus.on('skill.converse.error', self.handle_converse_error)
         self.bus.on('skill.converse.activate_skill',
@@ -39,17 +169,86 @@ class NeonIntentService(IntentService):
                     self.handle_activate_skill)
 
     def handle_activate_skill(self, message):
-        self.add_active_skill(message.data['skill_id'])
+        with self._session_scope(message):
+            self.add_active_skill(message.data['skill_id'])
+
+    def handle_activate_skill_request(self, message):
+        with self._session_scope(message):
+            super().handle_activate_skill_request(message)
 
     def handle_deactivate_skill(self, message):
-        self.remove_active_skill(message.data['skill_id'])
+        with self._session_scope(message):
+            self.remove_active_skill(message.data['skill_id'])
+
+    def handle_converse_error(self, message):
+        with self._session_scope(message):
+            super().handle_converse_error(message)
+
+    def handle_get_active_skills(self, message):
+        with self._session_scope(message):
+            super().handle_get_active_skills(message)
 
     def reset_converse(self, message):
         """Let skills know there was a problem with speech recognition"""
         lang = message.data.get('lang', "en-us")
-        set_default_lang(lang)
-        for skill in copy(self.active_skills):
-            self.do_converse([], skill[0], lang, message)
+        with self._session_scope(message):
+            for skill in copy(self.active_skills):
+                self.do_converse([], skill[0], lang, message)
+
+    def do_converse(self, utterances, skill_id, lang, message):
+        """Call skill and ask if they want to process the utterance.
+
+        IntentService.do_converse accepts the first skill.converse.response
+        on the bus, which may answer another skill or another session when
+        sessions are handled concurrently. Only the response of skill_id for
+        the session of message is accepted here.
+
+        Arguments:
+            utterances (list of tuples): utterances paired with normalized
+                                         versions.
+            skill_id: skill to query.
+            lang (str): current language
+            message (Message): message containing interaction info.
+        """
+        opmode = self.converse_config.get("converse_mode",
+                                          ConverseMode.ACCEPT_ALL)
+
+        if opmode == ConverseMode.BLACKLIST and skill_id in \
+                self.converse_config.get("converse_blacklist", []):
+            return False
+
+        elif opmode == ConverseMode.WHITELIST and skill_id not in \
+                self.converse_config.get("converse_whitelist", []):
+            return False
+
+        converse_msg = (message.reply("skill.converse.request", {
+            "skill_id": skill_id, "utterances": utterances, "lang": lang}))
+        session_id = get_session_id(converse_msg, self.session_key)
+        responses = []
+        received = Event()
+
+        def handle_response(response):
+            if response.data.get("skill_id") == skill_id and \
+                    get_session_id(response, self.session_key) == session_id:
+                responses.append(response)
+                received.set()
+
+        self.bus.on('skill.converse.response', handle_response)
+        try:
+            self.bus.emit(converse_msg)
+            received.wait(3.0)
+        finally:
+            self.bus.remove('skill.converse.response', handle_response)
+
+        result = responses[0] if responses else None
+        if result and 'error' in result.data:
+            self.handle_converse_error(result)
+            ret = False
+        elif result is not None:
+            ret = result.data.get('result', False)
+        else:
+            ret = False
+        return ret
 
     def handle_utterance(self, message):
         """Main entrypoint for handling user utterances with Mycroft skills
@@ -71,58 +270,133 @@ class NeonIntentService(IntentService):
         If all these fail the complete_intent_failure message will be sent
         and a generic info of the failure will be spoken.
 
+        With concurrent_sessions enabled, utterances of different sessions
+        are handled concurrently on the session worker pool, utterances of a
+        single session are handled in the order they were received.
+
         Arguments:
             message (Message): The messagebus data
         """
+        if self._session_dispatcher:
+            self._session_dispatcher.submit(
+                get_session_id(message, self.session_key),
+                self._handle_utterance, message)
+        else:
+            self._handle_utterance(message)
+
+    def _handle_utterance(self, message):
         try:
-            # Get language of the utterance
-            lang = message.data.get('lang', self.language_config["user"])
-            utterances = message.data.get('utterances', [])
-
-            message.context = message.context or {}
-            # Add or init timing data
-            if not message.context.get("timing"):
-                LOG.warning("No timing data available at intent service")
-                message.context["timing"] = {}
-            # TODO: This isn't necessarily a transcribe time, should be refactored here and in neon-test-utils DM
-            message.context["timing"]["transcribed"] = message.context["timing"].get("transcribed", time.time())
-
-            # pipe utterance trough parsers to get extra metadata
-            # use cases: translation, emotion_data, keyword spotting etc.
-            # parsers are ordered by priority
-            # keep in mind utterance might be modified by previous parser
-            stopwatch = Stopwatch()
-            with stopwatch:
-                for parser in self.parser_service.modules:
-                    # mutate utterances and retrieve extra data
-                    utterances, data = self.parser_service.parse(parser, utterances, lang)
-                    # update message context with extra data
-                    message.context = merge_dict(message.context, data)
-            message.context["timing"]["text_parsers"] = stopwatch.time
-            # normalize() changes "it's a boy" to "it is a boy", etc.
-            norm_utterances = [normalize(u.lower(), remove_articles=False)
-                               for u in utterances]
-
-            # Build list with raw utterance(s) first, then optionally a
-            # normalized version following.
-            combined = utterances + list(set(norm_utterances) -
-                                         set(utterances))
-            # filter empty utterances
-            combined = [u for u in combined if u.strip()]
-            if len(combined) == 0:
-                # STT filters those, but some parser module might do it to
-                # abort intent execution
-                LOG.debug("Received empty utterance!!")
-                reply = message.reply('intent_aborted',
-                                      {'utterances': message.data.get('utterances', []),
-                                       'lang': lang})
-                self.bus.emit(reply)
-                return
-
-            # now pass our modified message to mycroft-lib
-            message.data["lang"] = lang
-            message.data["utterances"] = utterances
-            # TODO: Consider how to implement 'and' parsing and converse here DM
-            super().handle_utterance(message)
+            if self._prepare_utterance(message):
+                self._handle_prepared_utterance(message)
         except Exception as err:
             LOG.exception(err)
+
+    def _handle_prepared_utterance(self, message):
+        # now pass our modified message to mycroft-lib
+        # TODO: Consider how to implement 'and' parsing and converse here DM
+        _handler.lang = message.data.get("lang")
+        try:
+            with self._session_scope(message):
+                super().handle_utterance(message)
+        finally:
+            _handler.lang = None
+
+    def handle_utterance_batch(self, message):
+        """Handle several user utterances received in one message.
+
+        message.data["messages"] is a list of {"data": ..., "context": ...}
+        entries, each equivalent to a 'recognizer_loop:utterance' message.
+        Entry contexts are merged over the context of the batch message.
+        Text parsing and normalization of all entries run concurrently, then
+        every entry is matched to an intent and answered with its own
+        context, exactly as if it had been received on its own. With
+        concurrent_sessions enabled, entries are handled on the session
+        workers instead, in order within each session.
+
+        Arguments:
+            message (Message): The messagebus data
+        """
+        messages = []
+        for entry in message.data.get("messages", []):
+            # entries are prepared concurrently and write into nested
+            # context dicts like "timing", each needs its own copy
+            context = deepcopy(message.context or {})
+            context.update(deepcopy(entry.get("context") or {}))
+            messages.append(Message('recognizer_loop:utterance',
+                                    entry.get("data", {}), context))
+        if self._session_dispatcher:
+            for msg in messages:
+                self.handle_utterance(msg)
+            return
+
+        def prepare(msg):
+            try:
+                return self._prepare_utterance(msg)
+            except Exception as err:
+                LOG.exception(err)
+                return False
+
+        prepared = list(self._batch_executor.map(prepare, messages))
+        for msg, ready in zip(messages, prepared):
+            if not ready:
+                continue
+            try:
+                self._handle_prepared_utterance(msg)
+            except Exception as err:
+                LOG.exception(err)
+
+    def _prepare_utterance(self, message):
+        """Run text parsers over the utterances of a message and update its
+        data for intent matching.
+
+        Arguments:
+            message (Message): 'recognizer_loop:utterance' message
+
+        Returns:
+            bool: True if the message should be passed on to intent matching
+        """
+        # Get language of the utterance
+        lang = message.data.get('lang', self.language_config["user"])
+        utterances = message.data.get('utterances', [])
+
+        message.context = message.context or {}
+        # Add or init timing data
+        if not message.context.get("timing"):
+            LOG.warning("No timing data available at intent service")
+            message.context["timing"] = {}
+        # TODO: This isn't necessarily a transcribe time, should be refactored here and in neon-test-utils DM
+        message.context["timing"]["transcribed"] = message.context["timing"].get("transcribed", time.time())
+
+        # pipe utterance trough parsers to get extra metadata
+        # use cases: translation, emotion_data, keyword spotting etc.
+        # parsers are ordered by priority
+        # keep in mind utterance might be modified by previous parser
+        stopwatch = Stopwatch()
+        with stopwatch:
+            utterances = self.parser_service.run_pipeline(utterances,
+                                                          lang, message)
+        message.context["timing"]["text_parsers"] = stopwatch.time
+        # normalize() changes "it's a boy" to "it is a boy", etc.
+        norm_utterances = [cached_normalize(u.lower(), lang,
+                                            remove_articles=False)
+                           for u in utterances]
+
+        # Build list with raw utterance(s) first, then optionally a
+        # normalized version following.
+        combined = utterances + list(set(norm_utterances) -
+                                     set(utterances))
+        # filter empty utterances
+        combined = [u for u in combined if u.strip()]
+        if len(combined) == 0:
+            # STT filters those, but some parser module might do it to
+            # abort intent execution
+            LOG.debug("Received empty utterance!!")
+            reply = message.reply('intent_aborted',
+                                  {'utterances': message.data.get('utterances', []),
+                                   'lang': lang})
+            self.bus.emit(reply)
+            return False
+
+        message.data["lang"] = lang
+        message.data["utterances"] = utterances
+        return True
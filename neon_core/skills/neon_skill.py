@@ -1,8 +1,11 @@
 import re
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from inspect import signature
 from os import walk
-from os.path import join, exists
-from threading import Timer
-import time
+from os.path import join, exists, isabs, normpath, relpath
+from os import cpu_count
+from threading import Condition, Lock, Timer
 from enum import Enum
 
 from mycroft import dialog
@@ -16,12 +19,15 @@ from mycroft.skills.settings import save_settings
 from mycroft.skills.skill_data import load_vocabulary, load_regex
 from padatious import IntentContainer
 
-from neon_core.language import DetectorFactory, TranslatorFactory, \
-    get_lang_config, get_language_dir
+from neon_core.language import get_shared_detector, \
+    get_shared_translator, get_lang_config, get_language_dir
 from neon_core.configuration import get_private_keys
-from neon_core.dialog import load_dialogs
-from neon_core.skills.decorators import AbortEvent, \
-    AbortQuestion, killable_event
+from neon_core.dialog import load_dialogs, MustacheDialogRenderer
+from neon_core.skills.resource_bundle import load_bundle
+from neon_core.skills.converse_engine import get_converse_engine
+from neon_core.skills.decorators import AbortEvent, AbortQuestion, \
+    get_killable_task
+from neon_core.skills.sessions import DEFAULT_SESSION, get_session_id
 from mycroft.skills import MycroftSkill
 
 
@@ -55,6 +61,74 @@ def get_non_properties(obj):
     return set(check_class(obj.__class__))
 
 
+def _index_directory(directory):
+    """Map the path of every file and directory below directory, relative
+    to it, to its full path."""
+    index = {}
+    for path, dirs, files in walk(directory):
+        for name in dirs + files:
+            full_path = join(path, name)
+            index[relpath(full_path, directory)] = full_path
+    return index
+
+
+def _index_filenames(directory):
+    """Map file names below directory to the first file with that name in
+    os.walk order."""
+    index = {}
+    for path, _, files in walk(directory):
+        for name in files:
+            index.setdefault(name, join(path, name))
+    return index
+
+
+_training_pool = None
+_training_pool_lock = Lock()
+
+
+def _get_training_pool():
+    """Get the pool training converse intents of all skills, each job trains
+    in a padatious subprocess so skills train in parallel."""
+    global _training_pool
+    with _training_pool_lock:
+        if _training_pool is None:
+            from neon_core.configuration import Configuration
+            config = Configuration.get().get("skills", {}).get(
+                "converse_training", {})
+            _training_pool = ThreadPoolExecutor(
+                max_workers=config.get("workers") or cpu_count() or 1,
+                thread_name_prefix="converse_training")
+        return _training_pool
+
+
+class _PendingResponse:
+    """A question waiting for the user's response.
+
+    Arguments:
+        task (KillableTask): killable handler asking the question, if any
+    """
+    def __init__(self, task=None):
+        self.task = task
+        self.response = None
+        self.finished = False
+        self.aborted = False
+        self._condition = Condition()
+
+    def set(self, response=None, aborted=False):
+        """Answer or abort the question, waking up the waiting thread."""
+        with self._condition:
+            self.response = response
+            self.aborted = aborted
+            self.finished = True
+            self._condition.notify_all()
+
+    def wait(self, timeout):
+        """Wait for the response, None if it's not received in time."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.finished, timeout)
+        return self.response
+
+
 class NeonSkill(MycroftSkill):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -62,8 +136,8 @@ class NeonSkill(MycroftSkill):
 
         # Lang support
         self.language_config = get_lang_config()
-        self.lang_detector = DetectorFactory.create()
-        self.translator = TranslatorFactory.create()
+        self.lang_detector = get_shared_detector()
+        self.translator = get_shared_translator()
 
         # conversational intents
         intent_cache = join(self.file_system.path, "intent_cache")
@@ -71,9 +145,22 @@ class NeonSkill(MycroftSkill):
         if "min_intent_conf" not in self.settings:
             self.settings["min_intent_conf"] = 0.6
         self.converse_intents = {}
+        self._converse_intent_files = {}
+        self._intent_training = None
+        # shared by all skills if skills.shared_converse_engine is enabled
+        self.converse_engine = get_converse_engine()
 
         self._threads = []
         self._original_converse = self.converse
+        # session id -> _PendingResponse, questions waiting for an answer
+        self._pending_responses = {}
+        self._pending_lock = Lock()
+        self._session_key = self.config_core.get("intents", {}).get(
+            "session_key", "session")
+        # (lang, resource dir) -> {relative path: path}, see _find_resource
+        self._resource_index = {}
+        # (root directory, lang) -> bundle, see _get_resource_bundle
+        self._resource_bundles = {}
 
     @property
     def lang(self):
@@ -89,12 +176,13 @@ class NeonSkill(MycroftSkill):
         """
         if bus:
             super().bind(bus)
-            self.train_internal_intents()
 
     def _register_system_event_handlers(self):
         super()._register_system_event_handlers()
         self.add_event("converse.deactivated", self._deactivate_skill)
         self.add_event("converse.activated", self._activate_skill)
+        self.add_event("mycroft.skills.abort_question",
+                       self._handle_abort_question)
 
     def register_converse_intent(self, intent_file, handler):
         """ converse padatious intents """
@@ -102,25 +190,91 @@ class NeonSkill(MycroftSkill):
         filename = self.find_resource(intent_file, 'vocab')
         if not filename:
             raise FileNotFoundError('Unable to find "{}"'.format(intent_file))
-        self.intent_parser.load_intent(name, filename)
+        if self.converse_engine:
+            # trainings requested while one runs are coalesced, intents
+            # registered after _register_decorated (e.g. in initialize)
+            # are trained as well
+            self.converse_engine.register_intent(name, filename)
+            self.converse_engine.train()
+        else:
+            self.intent_parser.load_intent(name, filename)
         self.converse_intents[name] = self.create_event_wrapper(handler)
+        self._converse_intent_files[name] = filename
+
+    def _converse_intents_hash(self):
+        """ hash of the names and contents of all converse intent files """
+        digest = hashlib.sha256()
+        for name, filename in sorted(self._converse_intent_files.items()):
+            digest.update(name.encode("utf-8"))
+            with open(filename, "rb") as f:
+                digest.update(f.read())
+        return digest.hexdigest()
 
     def train_internal_intents(self):
-        """ train internal padatious parser """
-        self.intent_parser.train(single_thread=True)
+        """ train internal padatious parser
+
+        Skipped without converse intents. If the intent files didn't change
+        since the last training, trained models are loaded from the intent
+        cache, else training runs in the background on the shared training
+        pool and converse intents are ignored until it's done. The shared
+        converse engine trains as intents are registered.
+        """
+        if not self.converse_intents or self.converse_engine:
+            return
+        hash_file = join(self.intent_parser.cache_dir, "converse.hash")
+        digest = self._converse_intents_hash()
+        try:
+            with open(hash_file) as f:
+                trained = f.read() == digest
+        except OSError:
+            trained = False
+        if trained:
+            # padatious loaded all models from its cache, nothing to train
+            self.intent_parser.train(single_thread=True)
+            return
+        self._intent_training = _get_training_pool().submit(
+            self._train_converse_intents, digest, hash_file)
+
+    def _train_converse_intents(self, digest, hash_file):
+        # runs on the training pool, nobody reads the returned future
+        try:
+            try:
+                trained = self.intent_parser.train_subprocess(
+                    single_thread=True)
+            except Exception as e:
+                LOG.warning("Converse intent training subprocess failed "
+                            "({}), training in process".format(e))
+                trained = self.intent_parser.train(single_thread=True)
+            if trained:
+                with open(hash_file, "w") as f:
+                    f.write(digest)
+            else:
+                LOG.error("Timed out training converse intents of " +
+                          self.skill_id)
+        except Exception:
+            LOG.exception("Failed to train converse intents of " +
+                          self.skill_id)
 
     def handle_internal_intents(self, message):
         """ called before converse method
         this gives active skills a chance to parse their own intents and
         consume the utterance, see conversational_intent decorator for usage
         """
+        if not self.converse_intents or (self._intent_training and
+                                         not self._intent_training.done()):
+            return False
         best_match = None
         best_score = 0
-        for utt in message.data['utterances']:
-            match = self.intent_parser.calc_intent(utt)
-            if match and match.conf > best_score:
-                best_match = match
-                best_score = match.conf
+        if self.converse_engine:
+            best_match = self.converse_engine.calc_intent(
+                self.skill_id, message.data['utterances'])
+            best_score = best_match.conf if best_match else 0
+        else:
+            for utt in message.data['utterances']:
+                match = self.intent_parser.calc_intent(utt)
+                if match and match.conf > best_score:
+                    best_match = match
+                    best_score = match.conf
 
         if best_score < self.settings["min_intent_conf"]:
             return False
@@ -158,37 +312,75 @@ class NeonSkill(MycroftSkill):
     def __get_response(self):
         """Helper to get a reponse from the user
 
+        Waits for the answer of the user in the session of the message being
+        handled, several sessions can have a question pending at once.
+
         Returns:
             str: user's response or None on a timeout
-        """
-
-        def converse(message):
-            utterances = message.data["utterances"]
-            converse.response = utterances[0] if utterances else None
-            converse.finished = True
-            return True
 
+        Raises:
+            AbortQuestion: if the question was aborted
+        """
+        session = get_session_id(dig_for_message(), self._session_key)
+        pending = _PendingResponse(get_killable_task())
         # install a temporary conversation handler
+        with self._pending_lock:
+            self._pending_responses[session] = pending
+            self.converse = self._converse_response
         self.make_active()
-        converse.finished = False
-        converse.response = None
-        self.converse = converse
-
-        # 10 for listener, 5 for SST, then timeout
-        # NOTE a threading event is not used otherwise we can't raise the
-        # AbortEvent exception to kill the thread
-        start = time.time()
-        while time.time() - start <= 15 and not converse.finished:
-            time.sleep(0.1)
-            if self._response is not False:
-                converse.response = self._response
-                converse.finished = True  # was overrided externally
-        self.converse = self._original_converse
-        return converse.response
-
-    def _handle_killed_wait_response(self):
-        self._response = None
-        self.converse = self._original_converse
+        try:
+            # 10 for listener, 5 for SST, then timeout
+            response = pending.wait(15)
+        finally:
+            with self._pending_lock:
+                if self._pending_responses.get(session) is pending:
+                    self._pending_responses.pop(session)
+                if not self._pending_responses:
+                    self.converse = self._original_converse
+        if pending.aborted:
+            raise AbortQuestion()
+        return response
+
+    def _converse_response(self, message):
+        """Conversation handler installed while questions are pending,
+        utterances of other sessions go to the skill's own converse."""
+        utterances = message.data.get("utterances")
+        session = get_session_id(message, self._session_key)
+        with self._pending_lock:
+            pending = self._pending_responses.get(session)
+        if pending:
+            pending.set(utterances[0] if utterances else None)
+            return True
+        if len(signature(self._original_converse).parameters) == 1:
+            return self._original_converse(message=message)
+        return self._original_converse(utterances=utterances,
+                                       lang=message.data.get("lang"))
+
+    def _handle_abort_question(self, message):
+        """Abort the pending question of the session of message, or all
+        pending questions if it has no session."""
+        session = get_session_id(message, self._session_key)
+        with self._pending_lock:
+            if session == DEFAULT_SESSION:
+                pending = list(self._pending_responses.values())
+            else:
+                pending = [self._pending_responses.get(session)]
+        for question in filter(None, pending):
+            question.set(aborted=True)
+
+    def _handle_killed_wait_response(self, task=None):
+        """Abort the pending questions asked by a killed handler, questions
+        of handlers serving other sessions keep waiting.
+
+        Arguments:
+            task (KillableTask): killed handler, None aborts all questions
+        """
+        with self._pending_lock:
+            pending = [question for question in
+                       self._pending_responses.values()
+                       if task is None or question.task is task]
+        for question in pending:
+            question.set(aborted=True)
 
     def _wait_response(self, is_cancel, validator, on_fail, num_retries):
         """Loop until a valid response is received from the user or the retry
@@ -199,15 +391,15 @@ class NeonSkill(MycroftSkill):
             validator (callbale): function checking for a valid response
             on_fail (callable): function handling retries
 
+        Returns:
+            str: user's response or None if aborted, canceled or timed out
         """
-        self._response = False
-        self._real_wait_response(is_cancel, validator, on_fail, num_retries)
-        while self._response is False:
-            time.sleep(0.1)
-        return self._response
-
-    @killable_event("mycroft.skills.abort_question", exc=AbortQuestion,
-                    callback=_handle_killed_wait_response)
+        try:
+            return self._real_wait_response(is_cancel, validator, on_fail,
+                                            num_retries)
+        except AbortQuestion:
+            return None
+
     def _real_wait_response(self, is_cancel, validator, on_fail, num_retries):
         """Loop until a valid response is received from the user or the retry
         limit is reached.
@@ -217,35 +409,29 @@ class NeonSkill(MycroftSkill):
             validator (callbale): function checking for a valid response
             on_fail (callable): function handling retries
 
+        Raises:
+            AbortQuestion: if the question was aborted
         """
         num_fails = 0
         while True:
-            if self._response is not False:
-                # usually None when aborted externally (is None)
-                # also allows overriding returned result from other events
-                return self._response
             response = self.__get_response()
 
             if response is None:
                 # if nothing said, prompt one more time
                 num_none_fails = 1 if num_retries < 0 else num_retries
                 if num_fails >= num_none_fails:
-                    self._response = None
-                    return
+                    return None
             else:
                 if validator(response):
-                    self._response = response
-                    return
+                    return response
 
                 # catch user saying 'cancel'
                 if is_cancel(response):
-                    self._response = None
-                    return
+                    return None
 
             num_fails += 1
-            if 0 < num_retries < num_fails or self._response is not False:
-                self._response = None
-                return
+            if 0 < num_retries < num_fails:
+                return None
 
             line = on_fail(response)
             if line:
@@ -347,31 +533,54 @@ class NeonSkill(MycroftSkill):
             if hasattr(method, 'converse_intents'):
                 for intent_file in getattr(method, 'converse_intents'):
                     self.register_converse_intent(intent_file, method)
+        self.train_internal_intents()
+
+    def _get_resource_index(self, lang, res_dirname, translated):
+        """Get the index of a resource directory, built on first use.
+
+        Arguments:
+            lang (str): language of the resources
+            res_dirname (str): resource directory, "locale" for the new scheme
+            translated (bool): index <skill>/<res_dirname>/<lang> instead of
+                               <skill>/<res_dirname>
+        """
+        key = (lang, res_dirname, translated)
+        index = self._resource_index.get(key)
+        if index is None:
+            root_path = join(self.root_dir, res_dirname)
+            if res_dirname == "locale":
+                index = _index_filenames(get_language_dir(root_path, lang))
+            elif translated:
+                index = _index_directory(get_language_dir(root_path, lang))
+            else:
+                index = _index_directory(root_path)
+            self._resource_index[key] = index
+        return index
 
     def _find_resource(self, res_name, lang, res_dirname=None):
         """Finds a resource by name, lang and dir
+
+        Resource directories are indexed once per skill instance, so new
+        files are found after the skill is reloaded.
         """
+        if isabs(res_name):
+            return res_name if exists(res_name) else None
+        rel_name = normpath(res_name)
         if res_dirname:
             # Try the old translated directory (dialog/vocab/regex)
-            root_path = get_language_dir(join(self.root_dir, res_dirname),
-                                         self.lang)
-            path = join(root_path, res_name)
-            if exists(path):
+            path = self._get_resource_index(lang, res_dirname,
+                                            True).get(rel_name)
+            if path:
                 return path
 
             # Try old-style non-translated resource
-            path = join(self.root_dir, res_dirname, res_name)
-            if exists(path):
+            path = self._get_resource_index(lang, res_dirname,
+                                            False).get(rel_name)
+            if path:
                 return path
 
         # New scheme:  search for res_name under the 'locale' folder
-        root_path = get_language_dir(join(self.root_dir, 'locale'), self.lang)
-        for path, _, files in walk(root_path):
-            if res_name in files:
-                return join(path, res_name)
-
-        # Not found
-        return None
+        return self._get_resource_index(lang, "locale", False).get(res_name)
 
     def create_event_wrapper(self, handler, handler_info=None):
         skill_data = {'name': get_handler_name(handler)}
@@ -474,7 +683,45 @@ class NeonSkill(MycroftSkill):
         if wait:
             wait_while_speaking()
 
+    def load_data_files(self, root_directory=None):
+        """Called by the skill loader to load intents, dialogs, etc.
+
+        With skills.resource_bundles enabled, init_dialog, load_vocab_files
+        and load_regex_files read from a single precompiled bundle per skill
+        and language.
+
+        Arguments:
+            root_directory (str): root folder to use when loading files.
+        """
+        try:
+            super().load_data_files(root_directory)
+        finally:
+            # bundles are checked for changed sources on every load
+            self._resource_bundles.clear()
+
+    def _get_resource_bundle(self, root_directory):
+        """Get the resource bundle of root_directory in the skill language,
+        None if skills.resource_bundles is disabled."""
+        bundle_config = self.config_core.get("skills", {}).get(
+            "resource_bundles", {})
+        if not bundle_config.get("enabled", True):
+            return None
+        key = (root_directory, self.lang)
+        if key not in self._resource_bundles:
+            self._resource_bundles[key] = load_bundle(
+                root_directory, self.skill_id, self.lang,
+                bundle_config.get("check_sources", True))
+        return self._resource_bundles[key]
+
     def init_dialog(self, root_directory):
+        bundle = self._get_resource_bundle(root_directory)
+        if bundle:
+            if bundle["dialog"] is not None:
+                self.dialog_renderer = MustacheDialogRenderer()
+                self.dialog_renderer.templates = bundle["dialog"]
+            else:
+                LOG.debug('No dialog loaded')
+            return
         # If "<skill>/dialog/<lang>" exists, load from there.  Otherwise
         # load dialog from "<skill>/locale/<lang>"
         dialog_dir = get_language_dir(join(root_directory, 'dialog'),
@@ -496,16 +743,20 @@ class NeonSkill(MycroftSkill):
             root_directory (str): root folder to use when loading files
         """
         keywords = []
-        vocab_dir = get_language_dir(join(root_directory, 'vocab'),
-                                     self.lang)
-        locale_dir = get_language_dir(join(root_directory, 'locale'),
-                                      self.lang)
-        if exists(vocab_dir):
-            keywords = load_vocabulary(vocab_dir, self.skill_id)
-        elif exists(locale_dir):
-            keywords = load_vocabulary(locale_dir, self.skill_id)
+        bundle = self._get_resource_bundle(root_directory)
+        if bundle:
+            keywords = bundle["vocab"]
         else:
-            LOG.debug('No vocab loaded')
+            vocab_dir = get_language_dir(join(root_directory, 'vocab'),
+                                         self.lang)
+            locale_dir = get_language_dir(join(root_directory, 'locale'),
+                                          self.lang)
+            if exists(vocab_dir):
+                keywords = load_vocabulary(vocab_dir, self.skill_id)
+            elif exists(locale_dir):
+                keywords = load_vocabulary(locale_dir, self.skill_id)
+            else:
+                LOG.debug('No vocab loaded')
 
         # For each found intent register the default along with any aliases
         for vocab_type in keywords:
@@ -523,14 +774,18 @@ class NeonSkill(MycroftSkill):
             root_directory (str): root folder to use when loading files
         """
         regexes = []
-        regex_dir = get_language_dir(join(root_directory, 'regex'),
-                                     self.lang)
-        locale_dir = get_language_dir(join(root_directory, 'locale'),
-                                      self.lang)
-        if exists(regex_dir):
-            regexes = load_regex(regex_dir, self.skill_id)
-        elif exists(locale_dir):
-            regexes = load_regex(locale_dir, self.skill_id)
+        bundle = self._get_resource_bundle(root_directory)
+        if bundle:
+            regexes = bundle["regex"]
+        else:
+            regex_dir = get_language_dir(join(root_directory, 'regex'),
+                                         self.lang)
+            locale_dir = get_language_dir(join(root_directory, 'locale'),
+                                          self.lang)
+            if exists(regex_dir):
+                regexes = load_regex(regex_dir, self.skill_id)
+            elif exists(locale_dir):
+                regexes = load_regex(locale_dir, self.skill_id)
 
         for regex in regexes:
             self.intent_service.register_adapt_regex(regex)
@@ -560,8 +815,10 @@ class NeonSkill(MycroftSkill):
 
     def default_shutdown(self):
         super().default_shutdown()
-        # kill any running kthreads from decorators
-        for t in self._threads:
+        if self.converse_engine and self.converse_intents:
+            self.converse_engine.remove_skill(self.skill_id)
+        # kill any running handlers from decorators
+        for t in list(self._threads):
             try:
                 t.kill()
             except:
@@ -0,0 +1,186 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""Precompiled per-skill, per-language bundles of dialog, vocab and regex
+resources, so loading a skill reads one file instead of walking its
+resource directories and parsing every .dialog/.voc/.rx file."""
+import hashlib
+import json
+import os
+import sys
+from os import walk
+from os.path import abspath, dirname, exists, expanduser, getmtime, isdir, \
+    join
+
+from mycroft.skills.skill_data import load_vocabulary, load_regex, to_alnum
+from mycroft.util.log import LOG
+
+from neon_core.configuration import Configuration
+from neon_core.dialog import load_dialogs
+from neon_core.language import get_language_dir
+
+BUNDLE_VERSION = 1
+
+
+def _resource_dir(root_directory, res_dirname, lang):
+    """Get the directory resources are loaded from, "<skill>/<res>/<lang>"
+    if it exists, else "<skill>/locale/<lang>", None if neither does."""
+    for dirname in (res_dirname, "locale"):
+        lang_dir = get_language_dir(join(root_directory, dirname), lang)
+        if exists(lang_dir):
+            return lang_dir
+    return None
+
+
+def _source_mtimes(root_directory, resource_dirs):
+    """Get the mtime of every file and directory a bundle depends on, the
+    skill's top level resource directories are included so new languages
+    or resource directories are noticed."""
+    mtimes = {}
+    for dirname in ("dialog", "vocab", "regex", "locale"):
+        path = join(root_directory, dirname)
+        mtimes[path] = getmtime(path) if isdir(path) else None
+    for resource_dir in set(filter(None, resource_dirs)):
+        for path, _, files in walk(resource_dir):
+            mtimes[path] = getmtime(path)
+            for f in files:
+                mtimes[join(path, f)] = getmtime(join(path, f))
+    return mtimes
+
+
+def get_bundle_dir():
+    """Get the directory bundles are stored in, skills.resource_bundles.
+    directory or "<data_dir>/skill_bundles" so bundles survive reboots."""
+    config = Configuration.get()
+    directory = config.get("skills", {}).get("resource_bundles", {}).get(
+        "directory") or join(config.get("data_dir", "~/neon"),
+                             "skill_bundles")
+    return expanduser(directory)
+
+
+def get_bundle_path(root_directory, skill_id, lang):
+    """Get the path of the bundle of a skill in a language, keyed on the
+    skill directory so different copies of a skill don't share a bundle."""
+    root_hash = hashlib.sha1(
+        abspath(root_directory).encode("utf-8")).hexdigest()[:12]
+    return join(get_bundle_dir(), "{}.{}.{}.json".format(
+        to_alnum(skill_id), root_hash, lang.lower()))
+
+
+def build_bundle(root_directory, skill_id, lang, path=None):
+    """Load the resources of a skill and write them to a bundle.
+
+    Arguments:
+        root_directory (str): skill directory
+        skill_id (str): skill identifier, vocab and regex are namespaced
+                        with it
+        lang (str): language to bundle
+        path (str): bundle file, defaults to get_bundle_path()
+
+    Returns:
+        dict: bundle with "dialog" templates, "vocab" and "regex" entries
+    """
+    dialog_dir = _resource_dir(root_directory, "dialog", lang)
+    vocab_dir = _resource_dir(root_directory, "vocab", lang)
+    regex_dir = _resource_dir(root_directory, "regex", lang)
+    bundle = {
+        "version": BUNDLE_VERSION,
+        "skill_id": skill_id,
+        "lang": lang,
+        "sources": _source_mtimes(root_directory,
+                                  [dialog_dir, vocab_dir, regex_dir]),
+        "dialog": load_dialogs(dialog_dir).templates if dialog_dir else None,
+        "vocab": load_vocabulary(vocab_dir, skill_id) if vocab_dir else {},
+        "regex": load_regex(regex_dir, skill_id) if regex_dir else []
+    }
+    path = path or get_bundle_path(root_directory, skill_id, lang)
+    try:
+        os.makedirs(dirname(path), exist_ok=True)
+        tmp_path = path + ".part"
+        with open(tmp_path, "w") as f:
+            json.dump(bundle, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        LOG.exception("Failed to write resource bundle: " + path)
+    return bundle
+
+
+def _is_current(bundle, skill_id, lang):
+    if bundle.get("version") != BUNDLE_VERSION or \
+            bundle.get("skill_id") != skill_id or bundle.get("lang") != lang:
+        return False
+    for path, mtime in bundle.get("sources", {}).items():
+        try:
+            if getmtime(path) != mtime:
+                return False
+        except OSError:
+            if mtime is not None:
+                return False
+    return True
+
+
+def load_bundle(root_directory, skill_id, lang, check_sources=True):
+    """Load the resource bundle of a skill, (re)building it if it doesn't
+    exist or its sources changed.
+
+    Arguments:
+        root_directory (str): skill directory
+        skill_id (str): skill identifier
+        lang (str): language to load
+        check_sources (bool): compare the mtimes of the source files with
+                              the bundle, disable if skills never change
+
+    Returns:
+        dict: bundle with "dialog" templates, "vocab" and "regex" entries
+    """
+    path = get_bundle_path(root_directory, skill_id, lang)
+    try:
+        with open(path) as f:
+            bundle = json.load(f)
+        if not check_sources or _is_current(bundle, skill_id, lang):
+            return bundle
+        LOG.debug("Resources of {} changed, rebuilding bundle".format(
+            skill_id))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError):
+        LOG.warning("Invalid resource bundle, rebuilding: " + path)
+    return build_bundle(root_directory, skill_id, lang, path)
+
+
+def build_bundles(skills_dir, langs):
+    """Build the bundles of all skills in a directory, skill ids are the
+    skill directory names as for locally installed skills."""
+    for skill_id in sorted(os.listdir(skills_dir)):
+        root_directory = join(skills_dir, skill_id)
+        if not exists(join(root_directory, "__init__.py")):
+            continue
+        for lang in langs:
+            LOG.info("Bundling {} ({})".format(skill_id, lang))
+            build_bundle(root_directory, skill_id, lang)
+
+
+if __name__ == "__main__":
+    # python -m neon_core.skills.resource_bundle <skills_dir> [lang ...]
+    build_bundles(sys.argv[1], sys.argv[2:] or ["en-us"])
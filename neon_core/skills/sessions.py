@@ -0,0 +1,111 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""Helpers for handling the interactions of several users concurrently"""
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from mycroft.util.log import LOG
+
+DEFAULT_SESSION = "default"
+
+
+def get_session_id(message, key="session"):
+    """Get the id of the session a message belongs to.
+
+    Arguments:
+        message (Message): message to inspect
+        key (str): context key holding the session id, or a dict with a
+                   "session_id" entry
+
+    Returns:
+        str: session id, DEFAULT_SESSION if the message has none
+    """
+    context = (message.context if message else None) or {}
+    session = context.get(key)
+    if isinstance(session, dict):
+        session = session.get("session_id")
+    return str(session) if session else DEFAULT_SESSION
+
+
+class SessionState:
+    """Conversational state of a single session"""
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.active_skills = []  # [skill_id , timestamp]
+        self.consecutive_activations = {}
+        self.last_used = time.time()
+
+
+class SessionDispatcher:
+    """Run tasks on a bounded thread pool, grouped by session.
+
+    Tasks of a single session run one at a time in submission order, tasks
+    of different sessions run concurrently. Sessions with pending tasks take
+    turns on the pool so a busy session can't starve the others.
+    """
+    def __init__(self, max_workers=8, thread_name_prefix="session"):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._queues = {}
+        self._lock = Lock()
+
+    def submit(self, session_id, func, *args):
+        """Queue func(*args) for execution after all tasks previously
+        submitted for session_id."""
+        with self._lock:
+            queue = self._queues.get(session_id)
+            if queue is not None:
+                queue.append((func, args))
+                return
+            self._queues[session_id] = deque([(func, args)])
+        self._executor.submit(self._run_next, session_id)
+
+    def _run_next(self, session_id):
+        with self._lock:
+            func, args = self._queues[session_id][0]
+        try:
+            func(*args)
+        except Exception as e:
+            LOG.exception(e)
+        with self._lock:
+            queue = self._queues[session_id]
+            queue.popleft()
+            if not queue:
+                self._queues.pop(session_id)
+                return
+        # requeue behind the sessions already waiting for a worker
+        self._executor.submit(self._run_next, session_id)
+
+    @property
+    def pending(self):
+        """Number of queued and running tasks per session"""
+        with self._lock:
+            return {session: len(queue)
+                    for session, queue in self._queues.items()}
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait)
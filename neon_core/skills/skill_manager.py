@@ -6,6 +6,9 @@ from mycroft.util import connected
 from mycroft.util.log import LOG
 from neon_core.skills.skill_loader import PluginSkillLoader, find_skill_plugins
 from neon_core.skills.skill_store import SkillsStore
+from neon_core.skills.sessions import SessionDispatcher, get_session_id
+from neon_core.skills.decorators import get_killable_pool
+from neon_utils.configuration_utils import get_neon_device_type
 
 
 class NeonSkillManager(SkillManager):
@@ -16,6 +19,21 @@ class NeonSkillManager(SkillManager):
                                             bus=self.bus)
         self.skill_downloader.skills_dir = self.msm.skills_dir
         self.plugin_skills = {}
+        # skill_id -> loader of skills in skill_loaders
+        self._loaders_by_id = {}
+        # skill_id -> (converse function, whether it takes a message)
+        self._converse_conventions = {}
+
+        intent_config = self.config.get("intents", {})
+        self.session_key = intent_config.get("session_key", "session")
+        concurrent = intent_config.get("concurrent_sessions")
+        if concurrent is None:
+            concurrent = get_neon_device_type() == "server"
+        self._converse_dispatcher = SessionDispatcher(
+            max_workers=intent_config.get("session_workers", 8),
+            thread_name_prefix="converse_session") if concurrent else None
+        self.bus.on("neon.skills.killable_handlers.stats",
+                    self.handle_killable_stats)
 
     def download_or_update_defaults(self):
         # on launch only install if missing, updates handled separately
@@ -33,6 +51,22 @@ class NeonSkillManager(SkillManager):
                     LOG.error(
                         "no internet, skipped default skills installation")
 
+    def _load_skill(self, skill_directory):
+        skill_loader = super()._load_skill(skill_directory)
+        loader = self.skill_loaders.get(skill_directory)
+        if loader is not None:
+            self._loaders_by_id[loader.skill_id] = loader
+        return skill_loader
+
+    def _unload_removed_skills(self):
+        super()._unload_removed_skills()
+        self._loaders_by_id = {loader.skill_id: loader
+                               for loader in self.skill_loaders.values()}
+        for skill_id in list(self._converse_conventions):
+            if skill_id not in self._loaders_by_id and \
+                    skill_id not in self.plugin_skills:
+                self._converse_conventions.pop(skill_id, None)
+
     def _load_new_skills(self):
         super()._load_new_skills()
         plugin_skills = []
@@ -68,6 +102,8 @@ class NeonSkillManager(SkillManager):
     def stop(self):
         """Tell the manager to shutdown."""
         super().stop()
+        if self._converse_dispatcher:
+            self._converse_dispatcher.shutdown()
         # Do a clean shutdown of all plugin skills
         for skill_loader in self.plugin_skills.values():
             if skill_loader.instance is not None:
@@ -81,23 +117,41 @@ class NeonSkillManager(SkillManager):
     def handle_converse_request(self, message):
         """Check if the targeted skill id can handle conversation
 
-        If supported, the conversation is invoked.
+        If supported, the conversation is invoked. With concurrent_sessions
+        enabled, requests of different sessions are handled concurrently and
+        requests of a single session in the order they were received.
         """
+        if self._converse_dispatcher:
+            self._converse_dispatcher.submit(
+                get_session_id(message, self.session_key),
+                self._handle_converse_request, message)
+        else:
+            self._handle_converse_request(message)
+
+    def _takes_message(self, skill_id, converse):
+        """Check if a converse method takes a message or utterances and
+        lang, the signature is only inspected when the method changed."""
+        func = getattr(converse, "__func__", converse)
+        convention = self._converse_conventions.get(skill_id)
+        if convention is None or convention[0] is not func:
+            convention = (func, len(signature(converse).parameters) == 1)
+            self._converse_conventions[skill_id] = convention
+        return convention[1]
+
+    def _handle_converse_request(self, message):
         skill_id = message.data['skill_id']
 
         def _converse(skill_loader):
             try:
                 # check the signature of a converse method
                 # to either pass a message or not
-                if len(signature(
-                        skill_loader.instance.converse).parameters) == 1:
-                    result = skill_loader.instance.converse(
-                        message=message)
+                converse = skill_loader.instance.converse
+                if self._takes_message(skill_id, converse):
+                    result = converse(message=message)
                 else:
                     utterances = message.data['utterances']
                     lang = message.data['lang']
-                    result = skill_loader.instance.converse(
-                        utterances=utterances, lang=lang)
+                    result = converse(utterances=utterances, lang=lang)
                 self._emit_converse_response(result, message, skill_loader)
             except Exception:
                 error_message = 'exception in converse method'
@@ -105,24 +159,21 @@ class NeonSkillManager(SkillManager):
                 self._emit_converse_error(message, skill_id, error_message)
 
         if skill_id in self.plugin_skills:
-            skill_found = True
             _converse(self.plugin_skills[skill_id])
-        else:
-            # loop trough skills list and call converse for skill with skill_id
-            skill_found = False
-            for skill_loader in self.skill_loaders.values():
-                if skill_loader.skill_id == skill_id:
-                    skill_found = True
-                    if not skill_loader.loaded:
-                        error_message = 'converse requested but skill not loaded'
-                        self._emit_converse_error(message, skill_id,
-                                                  error_message)
-                    else:
-                        _converse(skill_loader)
-                    break
-            else:
-                error_message = 'skill id does not exist'
+        elif skill_id in self._loaders_by_id:
+            skill_loader = self._loaders_by_id[skill_id]
+            if not skill_loader.loaded:
+                error_message = 'converse requested but skill not loaded'
                 self._emit_converse_error(message, skill_id, error_message)
+            else:
+                _converse(skill_loader)
+        else:
+            error_message = 'skill id does not exist'
+            self._emit_converse_error(message, skill_id, error_message)
+
+    def handle_killable_stats(self, message):
+        """Reply with queued, running and aborted killable handlers"""
+        self.bus.emit(message.response(get_killable_pool().stats()))
 
     def _emit_converse_error(self, message, skill_id, error_msg):
         super()._emit_converse_error(message, skill_id, error_msg)
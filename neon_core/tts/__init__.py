@@ -23,14 +23,15 @@
 # NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 from copy import deepcopy
-import hashlib
 import os
 import random
 import re
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from threading import Thread
 from time import time, sleep
-from neon_core.language import DetectorFactory, TranslatorFactory, get_lang_config
+from neon_core.language import get_shared_detector, \
+    get_shared_translator, get_lang_config
 
 import os.path
 from os.path import dirname, exists, isdir, join
@@ -41,10 +42,12 @@ from neon_core.configuration import Configuration, get_private_keys
 from mycroft.messagebus.message import Message, dig_for_message
 from mycroft.metrics import report_timing, Stopwatch
 from mycroft.util import (
-    play_wav, play_mp3, check_for_signal, create_signal, resolve_resource_file
+    check_for_signal, create_signal, resolve_resource_file
 )
 from mycroft.util.log import LOG
 from mycroft.util.plugins import load_plugin
+from neon_core.tts.cache import TTSCache, get_tts_cache
+from neon_core.tts.playback import AudioSinkFactory
 from queue import Queue, Empty
 
 
@@ -66,12 +69,12 @@ class PlaybackThread(Thread):
         self._terminated = False
         self._processing_queue = False
         self.enclosure = None
-        self.p = None
         # Check if the tts shall have a ducking role set
         if Configuration.get().get('tts', {}).get('pulse_duck'):
             self.pulse_env = _TTS_ENV
         else:
             self.pulse_env = None
+        self.sink = AudioSinkFactory.create(environment=self.pulse_env)
 
     def init(self, tts):
         self.tts = tts
@@ -80,26 +83,23 @@ class PlaybackThread(Thread):
         """Remove all pending playbacks."""
         while not self.queue.empty():
             self.queue.get()
-        try:
-            self.p.terminate()
-        except Exception:
-            pass
+        self.sink.clear()
 
     def run(self):
         """Thread main loop. Get audio and extra data from queue and play.
 
         The queue messages is a tuple containing
         snd_type: 'mp3' or 'wav' telling the loop what format the data is in
-        data: path to temporary audio data
+        data: path to temporary audio data or an iterable of audio bytes
         videmes: list of visemes to display while playing
         listen: if listening should be triggered at the end of the sentence.
 
-        Playback of audio is started and the visemes are sent over the bus
-        the loop then wait for the playback process to finish before starting
-        checking the next position in queue.
+        The visemes are sent over the bus and the audio is passed to the
+        audio sink, which returns once the chunk is about to finish so the
+        next position in queue follows without a gap.
 
-        If the queue is empty the tts.end_audio() is called possibly triggering
-        listening.
+        If the queue is empty the sink is drained and tts.end_audio() is
+        called possibly triggering listening.
         """
         while not self._terminated:
             try:
@@ -112,18 +112,14 @@ class PlaybackThread(Thread):
 
                 stopwatch = Stopwatch()
                 with stopwatch:
-                    if snd_type == 'wav':
-                        self.p = play_wav(data, environment=self.pulse_env)
-                    elif snd_type == 'mp3':
-                        self.p = play_mp3(data, environment=self.pulse_env)
                     if visemes:
                         self.show_visemes(visemes)
-                    if self.p:
-                        self.p.communicate()
-                        self.p.wait()
-                report_timing(ident, 'speech_playback', stopwatch)
+                    self.sink.play(snd_type, data)
+                report_timing(ident, 'speech_playback', stopwatch,
+                              {'sink': self.sink.name})
 
                 if self.queue.empty():
+                    self.sink.drain()
                     self.tts.end_audio(listen)
                     self._processing_queue = False
                 self.blink(0.2)
@@ -160,6 +156,7 @@ class PlaybackThread(Thread):
         """Stop thread"""
         self._terminated = True
         self.clear_queue()
+        self.sink.shutdown()
 
 
 class TTS(metaclass=ABCMeta):
@@ -181,8 +178,8 @@ class TTS(metaclass=ABCMeta):
         self.bus = None  # initalized in "init" step
 
         self.language_config = get_lang_config()
-        self.lang_detector = DetectorFactory.create()
-        self.translator = TranslatorFactory.create()
+        self.lang_detector = get_shared_detector()
+        self.translator = get_shared_translator()
         self.lang = lang or self.language_config.get("user", "en-us")
 
         self.config = config
@@ -198,11 +195,47 @@ class TTS(metaclass=ABCMeta):
         self.queue = Queue()
         self.playback = PlaybackThread(self.queue)
         self.playback.start()
-        self.clear_cache()
-        self.spellings = self.load_spellings()
+        # Chunks are synthesized concurrently and queued in order, so
+        # playback of the first chunk can start while the rest synthesize
+        self.synthesis_pool = ThreadPoolExecutor(
+            max_workers=Configuration.get().get('tts', {}).get(
+                'synthesis_workers', 2),
+            thread_name_prefix="tts_synthesis")
+        self.streaming = Configuration.get().get('tts', {}).get(
+            'streaming', True)
         self.tts_name = type(self).__name__
+        self.cache = self._init_cache()
+        if not Configuration.get().get('tts', {}).get('cache', {}).get(
+                'persistent', True):
+            self.clear_cache()
+        self.spellings = self.load_spellings()
         self.keys = get_private_keys()
 
+    def _init_cache(self):
+        """Get the audio cache for this engine from the tts config.
+
+        Cached audio persists across restarts and engine changes; an engine
+        starts warm from the index of its existing cache directory.
+        """
+        cache_config = Configuration.get().get('tts', {}).get('cache', {})
+        cache_dir = mycroft.util.get_cache_directory("tts/" + self.tts_name)
+        return get_tts_cache(cache_dir, self.audio_ext,
+                             max_size=int(cache_config.get('max_size_mb', 50)
+                                          * 1024 * 1024),
+                             max_entries=cache_config.get('max_entries', 1000))
+
+    def get_cache_key(self, sentence):
+        """Get the audio cache key for a sentence spoken by this engine.
+
+        Arguments:
+            sentence (str): sentence chunk to synthesize
+
+        Returns:
+            str: key identifying the audio in self.cache
+        """
+        return TTSCache.get_key(sentence, self.tts_name, self.voice,
+                                self.lang, self.config)
+
     def load_spellings(self):
         """Load phonetic spellings of words as dictionary"""
         path = join('text', self.lang.lower(), 'phonetic_spellings.txt')
@@ -228,8 +261,7 @@ class TTS(metaclass=ABCMeta):
 
         Sends the recognizer_loop:audio_output_end message (indicating
         that speaking is done for the moment) as well as trigger listening
-        if it has been requested. It also checks if cache directory needs
-        cleaning to free up disk space.
+        if it has been requested.
 
         Arguments:
             listen (bool): indication if listening trigger should be sent.
@@ -238,9 +270,6 @@ class TTS(metaclass=ABCMeta):
         self.bus.emit(Message("recognizer_loop:audio_output_end"))
         if listen:
             self.bus.emit(Message('mycroft.mic.listen'))
-        # Clean the cache as needed
-        cache_dir = mycroft.util.get_cache_directory("tts/" + self.tts_name)
-        mycroft.util.curate_cache(cache_dir, min_free_percent=100)
 
         # This check will clear the "signal"
         check_for_signal("isSpeaking")
@@ -255,6 +284,21 @@ class TTS(metaclass=ABCMeta):
         self.playback.init(self)
         self.enclosure = EnclosureAPI(self.bus)
         self.playback.enclosure = self.enclosure
+        self.bus.on("neon.tts.cache.stats", self.handle_cache_stats)
+        self.bus.on("neon.tts.cache.clear", self.handle_cache_clear)
+
+    def handle_cache_stats(self, message):
+        """Reply to a bus request with this engine's audio cache stats."""
+        self.bus.emit(message.response({"engine": self.tts_name,
+                                        **self.cache.stats()}))
+
+    def handle_cache_clear(self, message):
+        """Invalidate cached audio if this engine (or all engines) are
+        requested. An optional "voice" limits invalidation to one voice."""
+        engine = message.data.get("engine")
+        if engine and engine.lower() != self.tts_name.lower():
+            return
+        self.clear_cache(message.data.get("voice"))
 
     def get_tts(self, sentence, wav_file):
         """Abstract method that a tts implementation needs to implement.
@@ -270,6 +314,21 @@ class TTS(metaclass=ABCMeta):
         """
         pass
 
+    def get_tts_stream(self, sentence):
+        """Optional streaming counterpart of get_tts.
+
+        Engines able to return audio before synthesis completes override
+        this to return an iterable of audio data (bytes) in self.audio_ext
+        format. Engines that don't return None and get_tts is used.
+
+        Arguments:
+            sentence(str): Sentence to synthesize
+
+        Returns:
+            iterable: audio data chunks or None if streaming is unsupported
+        """
+        return None
+
     def modify_tag(self, tag):
         """Override to modify each supported ssml tag"""
         return tag
@@ -366,27 +425,81 @@ class TTS(metaclass=ABCMeta):
                                                 self.spellings[word.lower()])
 
         chunks = self._preprocess_sentence(sentence)
-        # Apply the listen flag to the last chunk, set the rest to False
-        chunks = [(chunks[i], listen if i == len(chunks) - 1 else False)
-                  for i in range(len(chunks))]
-
-        for sentence, l in chunks:
-            key = str(hashlib.md5(
-                sentence.encode('utf-8', 'ignore')).hexdigest())
-            wav_file = os.path.join(
-                mycroft.util.get_cache_directory("tts/" + self.tts_name),
-                key + '.' + self.audio_ext)
-
-            if os.path.exists(wav_file):
-                LOG.debug("TTS cache hit")
-                phonemes = self.load_phonemes(key)
-            else:
-                wav_file, phonemes = self.get_tts(sentence, wav_file)
-                if phonemes:
-                    self.save_phonemes(key, phonemes)
+        # Start synthesis of all chunks, identical chunks are only rendered
+        # once
+        futures = {}
+        for chunk in chunks:
+            if chunk not in futures:
+                futures[chunk] = self.synthesis_pool.submit(
+                    self._get_chunk_audio, chunk)
+
+        try:
+            for i, chunk in enumerate(chunks):
+                # Apply the listen flag to the last chunk
+                l = listen if i == len(chunks) - 1 else False
+                wav_file, phonemes = futures[chunk].result()
+                if not isinstance(wav_file, str):
+                    # Streams play once, a repeated chunk needs its own
+                    futures[chunk] = self.synthesis_pool.submit(
+                        self._get_chunk_audio, chunk)
+                vis = self.viseme(phonemes) if phonemes else None
+                self.queue.put((self.audio_ext, wav_file, vis, ident, l))
+        except Exception:
+            for future in futures.values():
+                future.cancel()
+            raise
+
+    def _get_chunk_audio(self, sentence):
+        """Get audio for a sentence chunk from cache or synthesize it.
+
+        Arguments:
+            sentence (str): sentence chunk to speak
 
-            vis = self.viseme(phonemes) if phonemes else None
-            self.queue.put((self.audio_ext, wav_file, vis, ident, l))
+        Returns:
+            tuple: (audio file path, phonemes)
+        """
+        key = self.get_cache_key(sentence)
+        wav_file = self.cache.get(key)
+
+        if wav_file:
+            LOG.debug("TTS cache hit")
+            phonemes = self.load_phonemes(key)
+        else:
+            stream = self.get_tts_stream(sentence) if self.streaming else None
+            if stream is not None:
+                return self._stream_to_cache(key, stream), None
+            cache_file = self.cache.audio_path(key)
+            wav_file, phonemes = self.get_tts(sentence, cache_file)
+            if phonemes:
+                self.save_phonemes(key, phonemes)
+            if wav_file == cache_file:
+                self.cache.add(key)
+        return wav_file, phonemes
+
+    def _stream_to_cache(self, key, stream):
+        """Pass through streamed audio while writing it to the cache.
+
+        The cache entry is only added once the stream completed, partial
+        audio from an interrupted stream is discarded.
+
+        Arguments:
+            key (str): cache key of the audio
+            stream (iterable): audio data from get_tts_stream()
+        """
+        cache_file = self.cache.audio_path(key)
+        part_file = cache_file + ".part"
+        complete = False
+        try:
+            with open(part_file, 'wb') as f:
+                for data in stream:
+                    f.write(data)
+                    yield data
+            os.replace(part_file, cache_file)
+            complete = True
+            self.cache.add(key)
+        finally:
+            if not complete and os.path.exists(part_file):
+                os.remove(part_file)
 
     def viseme(self, phonemes):
         """Create visemes from phonemes. Needs to be implemented for all
@@ -397,20 +510,15 @@ class TTS(metaclass=ABCMeta):
         """
         return None
 
-    def clear_cache(self):
-        """Remove all cached files."""
-        if not os.path.exists(mycroft.util.get_cache_directory('tts')):
-            return
-        for d in os.listdir(mycroft.util.get_cache_directory("tts")):
-            dir_path = os.path.join(mycroft.util.get_cache_directory("tts"), d)
-            if os.path.isdir(dir_path):
-                for f in os.listdir(dir_path):
-                    file_path = os.path.join(dir_path, f)
-                    if os.path.isfile(file_path):
-                        os.unlink(file_path)
-            # If no sub-folders are present, check if it is a file & clear it
-            elif os.path.isfile(dir_path):
-                os.unlink(dir_path)
+    def clear_cache(self, voice=None):
+        """Remove cached files of this engine.
+
+        Arguments:
+            voice (str): only remove audio spoken with this voice
+        """
+        LOG.info("Clearing {} TTS cache{}".format(
+            self.tts_name, " for voice " + voice if voice else ""))
+        self.cache.invalidate(voice)
 
     def save_phonemes(self, key, phonemes):
         """Cache phonemes
@@ -419,8 +527,7 @@ class TTS(metaclass=ABCMeta):
             key:        Hash key for the sentence
             phonemes:   phoneme string to save
         """
-        cache_dir = mycroft.util.get_cache_directory("tts/" + self.tts_name)
-        pho_file = os.path.join(cache_dir, key + ".pho")
+        pho_file = self.cache.phonemes_path(key)
         try:
             with open(pho_file, "w") as cachefile:
                 cachefile.write(phonemes)
@@ -434,9 +541,7 @@ class TTS(metaclass=ABCMeta):
         Arguments:
             Key:    Key identifying phoneme cache
         """
-        pho_file = os.path.join(
-            mycroft.util.get_cache_directory("tts/" + self.tts_name),
-            key + ".pho")
+        pho_file = self.cache.phonemes_path(key)
         if os.path.exists(pho_file):
             try:
                 with open(pho_file, "r") as cachefile:
@@ -447,6 +552,7 @@ class TTS(metaclass=ABCMeta):
         return None
 
     def __del__(self):
+        self.synthesis_pool.shutdown(wait=False)
         self.playback.stop()
         self.playback.join()
 
@@ -507,15 +613,15 @@ def load_tts_plugin(module_name):
 
 
 class TTSFactory:
+    from mycroft.tts import TTSFactory as MycroftTTSFactory
     from neon_core.tts.mimic_tts import Mimic
     from neon_core.tts.mimic2_tts import Mimic2
     from neon_core.tts.polly_tts import PollyTTS
 
-    CLASSES = {
-        "mimic": Mimic,
-        "mimic2": Mimic2,
-        "polly": PollyTTS
-    }
+    # engines without a neon implementation are created from mycroft's
+    # classes and keep mycroft's cache handling
+    CLASSES = dict(MycroftTTSFactory.CLASSES,
+                   mimic=Mimic, mimic2=Mimic2, polly=PollyTTS)
 
     @staticmethod
     def create():
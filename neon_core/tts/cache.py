@@ -0,0 +1,263 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from threading import Lock
+
+from mycroft.util.log import LOG
+
+_caches = {}
+_caches_lock = Lock()
+
+
+def get_tts_cache(cache_dir, audio_ext='wav', **kwargs):
+    """Get the process wide TTSCache for a cache directory.
+
+    Engines re-created after a config change (or a fallback engine sharing
+    a directory) reuse the already loaded index instead of rescanning disk.
+
+    Arguments:
+        cache_dir (str): directory holding cached audio
+        audio_ext (str): extension of cached audio files
+        kwargs: size limits passed to TTSCache
+
+    Returns:
+        TTSCache: cache for cache_dir
+    """
+    with _caches_lock:
+        cache = _caches.get(cache_dir)
+        if cache is None or cache.audio_ext != audio_ext:
+            cache = TTSCache(cache_dir, audio_ext, **kwargs)
+            _caches[cache_dir] = cache
+        else:
+            cache.max_size = kwargs.get("max_size", cache.max_size)
+            cache.max_entries = kwargs.get("max_entries", cache.max_entries)
+        return cache
+
+
+class TTSCache:
+    """Size bounded, content addressed cache of synthesized audio.
+
+    Cached files live in ``cache_dir`` as ``<key>.<audio_ext>`` with an
+    optional ``<key>.pho`` phoneme file next to them. The directory is
+    indexed once on creation; afterwards hit/miss decisions are made against
+    the in-memory index only. Entries are evicted least recently used first
+    whenever the byte budget or the entry count is exceeded.
+
+    Arguments:
+        cache_dir (str): directory holding cached audio
+        audio_ext (str): extension of cached audio files ('wav' or 'mp3')
+        max_size (int): maximum total size of cached audio in bytes
+        max_entries (int): maximum number of cached utterances
+    """
+    def __init__(self, cache_dir, audio_ext='wav',
+                 max_size=50 * 1024 * 1024, max_entries=1000):
+        self.cache_dir = cache_dir
+        self.audio_ext = audio_ext
+        self.max_size = max_size
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._index = OrderedDict()  # key -> size in bytes, LRU first
+        self._size = 0
+        self._lock = Lock()
+        self.load()
+
+    @staticmethod
+    def normalize_text(sentence):
+        """Normalize whitespace in and around ssml tags so equivalent
+        markup maps to the same cache entry."""
+        sentence = re.sub(r'\s+', ' ', sentence)
+        sentence = re.sub(r'<\s*([^>]*?)\s*>', r'<\1>', sentence)
+        return sentence.strip()
+
+    @staticmethod
+    def get_key(sentence, engine, voice=None, lang=None, config=None):
+        """Build the cache key for a sentence rendered by a given engine.
+
+        Keys are prefixed with the voice so entries can be invalidated per
+        voice without any additional metadata.
+
+        Arguments:
+            sentence (str): text (optionally ssml) to synthesize
+            engine (str): name of the TTS engine
+            voice (str): voice used by the engine
+            lang (str): language the sentence is spoken in
+            config (dict): engine configuration
+
+        Returns:
+            str: hex digest identifying the rendered audio
+        """
+        config = json.dumps(config or {}, sort_keys=True, default=str)
+        data = "\n".join([engine or "", voice or "", (lang or "").lower(),
+                          config, TTSCache.normalize_text(sentence)])
+        digest = hashlib.sha1(data.encode('utf-8', 'ignore')).hexdigest()
+        return TTSCache.voice_prefix(voice) + digest
+
+    @staticmethod
+    def voice_prefix(voice):
+        """Get the key prefix shared by all entries for a voice, entries
+        without a voice use "default." so cached files are never hidden."""
+        return (re.sub(r"[^\w-]", "", voice or "") or "default") + "."
+
+    def audio_path(self, key):
+        return os.path.join(self.cache_dir, key + '.' + self.audio_ext)
+
+    def phonemes_path(self, key):
+        return os.path.join(self.cache_dir, key + '.pho')
+
+    def load(self):
+        """(Re)build the in-memory index from the files in cache_dir."""
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            suffix = '.' + self.audio_ext
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(suffix) and entry.is_file():
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime,
+                                        entry.name[:-len(suffix)],
+                                        stat.st_size))
+        with self._lock:
+            self._index.clear()
+            self._size = 0
+            for _, key, size in sorted(entries):
+                self._index[key] = size
+                self._size += size
+            self._evict()
+        LOG.debug("Indexed {} cached TTS files in {}".format(
+            len(self._index), self.cache_dir))
+
+    def get(self, key):
+        """Look up a cache entry and mark it as recently used.
+
+        Arguments:
+            key (str): cache key from get_key()
+
+        Returns:
+            str: path to the cached audio or None on a cache miss
+        """
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+        return self.audio_path(key)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def add(self, key):
+        """Index a freshly written audio file, evicting old entries if the
+        cache grew past its limits.
+
+        Arguments:
+            key (str): cache key the audio was written under
+        """
+        try:
+            size = os.path.getsize(self.audio_path(key))
+        except OSError:
+            LOG.warning("Cached TTS audio missing for key: " + key)
+            return
+        with self._lock:
+            self._size += size - self._index.pop(key, 0)
+            self._index[key] = size
+            self._evict()
+
+    def remove(self, key):
+        """Remove an entry and its files from the cache."""
+        with self._lock:
+            if key in self._index:
+                self._size -= self._index.pop(key)
+        self._delete_files(key)
+
+    def clear(self):
+        """Remove all entries and files from the cache."""
+        with self._lock:
+            self._index.clear()
+            self._size = 0
+        if not os.path.isdir(self.cache_dir):
+            return
+        for f in os.listdir(self.cache_dir):
+            file_path = os.path.join(self.cache_dir, f)
+            if os.path.isfile(file_path):
+                os.unlink(file_path)
+
+    def invalidate(self, voice=None):
+        """Remove cached entries for one voice, or all entries.
+
+        Arguments:
+            voice (str): voice to invalidate, None to clear the whole cache
+        """
+        if voice is None:
+            self.clear()
+            return
+        prefix = self.voice_prefix(voice)
+        with self._lock:
+            keys = [k for k in self._index if k.startswith(prefix)]
+        for key in keys:
+            self.remove(key)
+
+    def stats(self):
+        """Get usage statistics of this cache.
+
+        Returns:
+            dict: entry count, size and limits plus hit/miss/eviction counts
+        """
+        return {"entries": len(self._index),
+                "size": self._size,
+                "max_entries": self.max_entries,
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions}
+
+    def _evict(self):
+        """Drop least recently used entries until within limits.
+        Must be called with the lock held."""
+        while self._index and (len(self._index) > self.max_entries or
+                               self._size > self.max_size):
+            key, size = self._index.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            self._delete_files(key)
+            LOG.debug("Evicted from TTS cache: " + key)
+
+    def _delete_files(self, key):
+        for path in (self.audio_path(key), self.phonemes_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                LOG.exception("Failed to remove {} from cache".format(path))
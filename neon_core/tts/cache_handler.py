@@ -157,15 +157,21 @@ def download_audio(cache_audio_dir, cache_text_file):
                   .format(missing_path))
 
 
-def copy_cache(cache_audio_dir):
+def copy_cache(cache_audio_dir, cache_text_file=None, tts=None):
     """
     This method copies the cache from 'cache_audio_dir'
     to TTS specific cache directory given by
-    get_cache_directory()
+    get_cache_directory(). If a TTS object is given, the files are
+    renamed to that engine's cache keys and indexed in its cache.
     Args:
         cache_audio_dir (path): path containing .wav files
+        cache_text_file (file): file containing the sentences
+        tts (TTS): engine whose cache receives the files
     """
     if os.path.exists(cache_audio_dir):
+        if tts and cache_text_file and os.path.isfile(cache_text_file):
+            _import_cache(cache_audio_dir, cache_text_file, tts)
+            return
         # get tmp directory where tts cache is stored
         dest = get_cache_directory('tts/' + 'Mimic2')
         files = os.listdir(cache_audio_dir)
@@ -178,12 +184,42 @@ def copy_cache(cache_audio_dir):
                   .format(TTS))
 
 
+def _import_cache(cache_audio_dir, cache_text_file, tts):
+    """
+    Copy pre-loaded audio into the cache of 'tts', keyed the same way
+    TTS._execute looks entries up.
+    Args:
+        cache_audio_dir (path): path containing .wav files
+        cache_text_file (file): file containing the sentences
+        tts (TTS): engine whose cache receives the files
+    """
+    with open(cache_text_file, 'r') as fp:
+        all_dialogs = fp.readlines()
+    for each_dialog in all_dialogs:
+        each_dialog = each_dialog.strip()
+        old_key = str(hashlib.md5(
+            each_dialog.encode('utf-8', 'ignore')).hexdigest())
+        wav_file = os.path.join(cache_audio_dir, old_key + '.wav')
+        if not os.path.isfile(wav_file):
+            continue
+        key = tts.get_cache_key(each_dialog)
+        if key in tts.cache:
+            continue
+        shutil.copy2(wav_file, tts.cache.audio_path(key))
+        pho_file = os.path.join(cache_audio_dir, old_key + '.pho')
+        if os.path.isfile(pho_file):
+            shutil.copy2(pho_file, tts.cache.phonemes_path(key))
+        tts.cache.add(key)
+    LOG.debug("Imported pre-loaded cache for {} into {}"
+              .format(TTS, tts.cache.cache_dir))
+
+
 # Start here
-def main(cache_audio_dir):
+def main(cache_audio_dir, tts=None):
     # Path where cache is stored and not cleared on reboot/TTS change
     if cache_audio_dir:
         cache_text_file = os.path.join(cache_audio_dir,
                                        '..', 'cache_text.txt')
         generate_cache_text(cache_audio_dir, cache_text_file)
         download_audio(cache_audio_dir, cache_text_file)
-        copy_cache(cache_audio_dir)
+        copy_cache(cache_audio_dir, cache_text_file, tts)
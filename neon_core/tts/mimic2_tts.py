@@ -27,7 +27,7 @@ from neon_core.tts import TTS, TTSValidator
 from mycroft.tts.remote_tts import RemoteTTSTimeoutException
 from mycroft.util.log import LOG
 from neon_core.tts import cache_handler
-from mycroft.util import play_wav, get_cache_directory
+from mycroft.util import play_wav
 from requests_futures.sessions import FuturesSession
 from requests.exceptions import (
     ReadTimeout, ConnectionError, ConnectTimeout, HTTPError
@@ -184,7 +184,7 @@ class Mimic2(TTS):
         )
         try:
             LOG.info("Getting Pre-loaded cache")
-            cache_handler.main(config['preloaded_cache'])
+            cache_handler.main(config['preloaded_cache'], self)
             LOG.info("Successfully downloaded Pre-loaded cache")
         except Exception as e:
             LOG.error("Could not get the pre-loaded cache ({})"
@@ -283,8 +283,7 @@ class Mimic2(TTS):
                 key:        Hash key for the sentence
                 phonemes:   phoneme string to save
         """
-        cache_dir = get_cache_directory("tts/" + self.tts_name)
-        pho_file = os.path.join(cache_dir, key + ".pho")
+        pho_file = self.cache.phonemes_path(key)
         try:
             with open(pho_file, "w") as cachefile:
                 cachefile.write(json.dumps(phonemes))
@@ -298,8 +297,7 @@ class Mimic2(TTS):
             Args:
                 Key:    Key identifying phoneme cache
         """
-        pho_file = os.path.join(get_cache_directory("tts/" + self.tts_name),
-                                key + ".pho")
+        pho_file = self.cache.phonemes_path(key)
         if os.path.exists(pho_file):
             try:
                 with open(pho_file, "r") as cachefile:
@@ -0,0 +1,395 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Audio sinks used by the TTS PlaybackThread to play synthesized speech.
+
+A sink receives audio chunk by chunk, either as a file path or as an
+iterable of bytes, and returns from play() once the chunk is (about to be)
+done playing so the next chunk follows without a gap.
+"""
+import subprocess
+import wave
+from abc import ABCMeta, abstractmethod
+from threading import Event, Lock, Thread
+from time import monotonic
+
+from neon_core.configuration import Configuration
+from mycroft.util import play_wav, play_mp3
+from mycroft.util.log import LOG
+
+
+_PCM_FORMATS = {1: "u8", 2: "s16le", 4: "s32le"}
+# bytes written to the player at once, clear() waits for at most one write
+_WRITE_SIZE = 4096
+
+
+class PlayerExitedError(Exception):
+    """The PCM player exited without being stopped."""
+
+
+class AudioSink(metaclass=ABCMeta):
+    """Destination for TTS audio, kept open across chunks.
+
+    Arguments:
+        config (dict): tts playback configuration
+        environment (dict): environment for player subprocesses
+    """
+    def __init__(self, config=None, environment=None):
+        self.config = config or {}
+        self.environment = environment
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+    @abstractmethod
+    def play(self, snd_type, data):
+        """Play a chunk of audio, blocking until it is (nearly) played.
+
+        Arguments:
+            snd_type (str): 'mp3' or 'wav'
+            data: path to the audio file or an iterable of audio bytes
+        """
+
+    def drain(self):
+        """Block until all audio passed to play() finished playing."""
+
+    def clear(self):
+        """Stop playback immediately, discarding any buffered audio."""
+
+    def shutdown(self):
+        """Release the sink's resources."""
+        self.clear()
+
+
+class SubprocessSink(AudioSink):
+    """Start the configured player command for every chunk.
+
+    Files are played through play_wav/play_mp3, streams are piped to the
+    same command with %1 replaced by "-".
+    """
+    def __init__(self, config=None, environment=None):
+        super().__init__(config, environment)
+        self.p = None
+
+    def play(self, snd_type, data):
+        if isinstance(data, str):
+            if snd_type == 'wav':
+                self.p = play_wav(data, environment=self.environment)
+            elif snd_type == 'mp3':
+                self.p = play_mp3(data, environment=self.environment)
+            if self.p:
+                self.p.communicate()
+                self.p.wait()
+        else:
+            self._play_stream(snd_type, data)
+
+    def _play_stream(self, snd_type, stream):
+        config = Configuration.get()
+        cmd = config.get('play_mp3_cmdline') if snd_type == 'mp3' else \
+            config.get('play_wav_cmdline')
+        cmdline = [e if e != '%1' else '-' for e in str(cmd).split(" ")]
+        try:
+            self.p = subprocess.Popen(cmdline, stdin=subprocess.PIPE,
+                                      env=self.environment)
+        except OSError:
+            LOG.exception("Failed to launch audio stream: {}".format(cmd))
+            self.p = None
+            return
+        try:
+            for data in stream:
+                self.p.stdin.write(data)
+            self.p.stdin.close()
+        except (BrokenPipeError, ValueError):
+            # Player was terminated by clear()
+            LOG.debug("Audio stream playback interrupted")
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+        self.p.wait()
+
+    def clear(self):
+        try:
+            self.p.terminate()
+        except Exception:
+            pass
+
+
+class PCMPipeSink(AudioSink):
+    """Feed raw PCM to a single long-lived player process.
+
+    WAV chunks are unpacked in-process and MP3 is decoded to PCM by the
+    configured decoder, so consecutive chunks are concatenated in the
+    player's buffer without restarting it. The player is only restarted
+    when the sample format changes or after clear() flushed it. Audio this
+    sink can't handle is passed on to a SubprocessSink. If the player
+    can't be started or exits by itself (e.g. no audio server), a warning
+    is logged and all further audio is played through the SubprocessSink.
+
+    Configuration (tts.playback):
+        pcm_cmdline: player reading raw PCM from stdin, {rate}, {channels}
+                     and {format} are filled in from the audio
+        mp3_decode_cmdline: decoder writing raw PCM to stdout, %1 is the
+                            input file or "-" for stdin
+        mp3_rate: sample rate MP3 audio is decoded to
+        lead_time: seconds of audio left buffered when play() returns
+    """
+    def __init__(self, config=None, environment=None):
+        super().__init__(config, environment)
+        self.cmd = self.config.get(
+            "pcm_cmdline", "paplay --raw --rate={rate} --channels={channels}"
+                           " --format={format} --stream-name=mycroft-voice")
+        self.decode_cmd = self.config.get(
+            "mp3_decode_cmdline", "mpg123 -q -s -m -r {rate} %1")
+        self.mp3_rate = self.config.get("mp3_rate", 22050)
+        self.lead_time = self.config.get("lead_time", 0.1)
+        self.fallback = SubprocessSink(config, environment)
+        self.failed = False
+        self.p = None
+        self.params = None
+        self._bytes_per_second = 0
+        self._play_until = 0
+        self._cleared = Event()
+        self._lock = Lock()
+
+    def play(self, snd_type, data):
+        self._cleared.clear()
+        if self.failed:
+            self.fallback.play(snd_type, data)
+            return
+        try:
+            if snd_type == 'wav' and isinstance(data, str):
+                self._play_wav(data)
+            elif snd_type == 'mp3':
+                self._play_mp3(data)
+            else:
+                self.drain()
+                self.fallback.play(snd_type, data)
+                return
+            self._wait(self.lead_time)
+            self._check_player()
+        except (OSError, PlayerExitedError) as e:
+            LOG.warning("PCM player failed ({}), falling back to subprocess "
+                        "playback: {}".format(e, self.cmd))
+            self.failed = True
+            with self._lock:
+                self._stop_player()
+            if isinstance(data, str):
+                self.fallback.play(snd_type, data)
+            else:
+                LOG.error("Audio stream lost with the PCM player")
+
+    def _play_wav(self, path):
+        try:
+            with wave.open(path, 'rb') as w:
+                params = (w.getframerate(), w.getnchannels(),
+                          _PCM_FORMATS[w.getsampwidth()])
+                frames = w.readframes(w.getnframes())
+        except (wave.Error, KeyError, EOFError):
+            LOG.warning("Can't stream {} as PCM, playing it as a "
+                        "file".format(path))
+            self.drain()
+            self.fallback.play('wav', path)
+            return
+        self._write(params, frames)
+
+    def _play_mp3(self, data):
+        params = (self.mp3_rate, 1, "s16le")
+        uri = data if isinstance(data, str) else "-"
+        cmdline = [e if e != '%1' else uri for e in
+                   self.decode_cmd.format(rate=self.mp3_rate).split(" ")]
+        try:
+            decoder = subprocess.Popen(
+                cmdline, stdout=subprocess.PIPE,
+                stdin=subprocess.PIPE if uri == "-" else None)
+        except OSError:
+            LOG.exception("Failed to launch MP3 decoder: " + self.decode_cmd)
+            self.drain()
+            self.fallback.play('mp3', data)
+            return
+        if uri == "-":
+            Thread(target=self._feed, args=(decoder, data),
+                   daemon=True).start()
+        try:
+            while not self._cleared.is_set():
+                pcm = decoder.stdout.read1(_WRITE_SIZE)
+                if not pcm:
+                    break
+                self._write(params, pcm)
+        finally:
+            if self._cleared.is_set():
+                decoder.kill()
+            decoder.stdout.close()
+            decoder.wait()
+
+    @staticmethod
+    def _feed(decoder, stream):
+        try:
+            for data in stream:
+                decoder.stdin.write(data)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+            try:
+                decoder.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def _write(self, params, pcm):
+        """Write PCM with the given (rate, channels, format) to the player,
+        (re)starting it if needed.
+
+        A write blocks while the player's pipe is full, so PCM is written in
+        slices of _WRITE_SIZE bytes and clear() can kill the player between
+        them instead of waiting for most of a sentence to play."""
+        if self.p and params != self.params:
+            # Let audio in the old format finish before switching
+            self.drain()
+        pcm = memoryview(pcm)
+        for start in range(0, len(pcm), _WRITE_SIZE):
+            with self._lock:
+                if self._cleared.is_set():
+                    LOG.debug("Audio sink interrupted")
+                    return
+                self._check_player()
+                if self.p is None or params != self.params:
+                    self._start_player(params)
+                data = pcm[start:start + _WRITE_SIZE]
+                try:
+                    self.p.stdin.write(data)
+                    self.p.stdin.flush()
+                except (BrokenPipeError, ValueError):
+                    if not self._cleared.is_set():
+                        raise PlayerExitedError(
+                            "exit code {}".format(self.p.wait()))
+                    LOG.debug("Audio sink interrupted")
+                    return
+                self._play_until = max(monotonic(), self._play_until) + \
+                    len(data) / self._bytes_per_second
+
+    def _start_player(self, params):
+        self._stop_player()
+        rate, channels, fmt = params
+        cmdline = self.cmd.format(rate=rate, channels=channels,
+                                  format=fmt).split(" ")
+        self.p = subprocess.Popen(cmdline, stdin=subprocess.PIPE,
+                                  env=self.environment)
+        self.params = params
+        sample_width = int(''.join(c for c in fmt if c.isdigit())) // 8
+        self._bytes_per_second = rate * channels * sample_width
+        self._play_until = monotonic()
+
+    def _check_player(self):
+        """Raise PlayerExitedError if the player exited by itself, it only
+        stops when killed by _stop_player."""
+        if self.p is not None and self.p.poll() is not None:
+            raise PlayerExitedError("exit code {}".format(self.p.returncode))
+
+    def _wait(self, remaining):
+        """Wait until at most 'remaining' seconds of audio are buffered."""
+        timeout = self._play_until - remaining - monotonic()
+        if timeout > 0:
+            self._cleared.wait(timeout)
+
+    def drain(self):
+        self._wait(0)
+
+    def _stop_player(self):
+        if self.p:
+            try:
+                self.p.kill()
+                self.p.wait()
+            except Exception:
+                pass
+        self.p = None
+
+    def clear(self):
+        self._cleared.set()
+        self.fallback.clear()
+        with self._lock:
+            # Killing the player drops everything left in its buffer
+            self._stop_player()
+            self._play_until = 0
+
+    def shutdown(self):
+        self.clear()
+
+
+class FileSink(AudioSink):
+    """Append all audio data to a local file, mostly useful for tests.
+
+    Configuration (tts.playback):
+        file: path audio is written to
+    """
+    def __init__(self, config=None, environment=None):
+        super().__init__(config, environment)
+        self.path = self.config.get("file", "/tmp/neon_tts_playback")
+
+    def play(self, snd_type, data):
+        with open(self.path, 'ab') as out:
+            if isinstance(data, str):
+                with open(data, 'rb') as f:
+                    out.write(f.read())
+            else:
+                for chunk in data:
+                    out.write(chunk)
+
+
+class NullSink(AudioSink):
+    """Discard all audio."""
+    def play(self, snd_type, data):
+        if not isinstance(data, str):
+            for _ in data:
+                pass
+
+
+class AudioSinkFactory:
+    CLASSES = {
+        "subprocess": SubprocessSink,
+        "pcm": PCMPipeSink,
+        "file": FileSink,
+        "null": NullSink
+    }
+
+    @staticmethod
+    def create(environment=None):
+        """Create the audio sink selected in the tts configuration.
+
+        "tts": {
+            "playback": {
+                "backend": <subprocess|pcm|file|null>
+            }
+        }
+        """
+        config = Configuration.get().get('tts', {}).get('playback', {})
+        backend = config.get("backend", "subprocess")
+        clazz = AudioSinkFactory.CLASSES.get(backend)
+        if clazz is None:
+            LOG.error("Unknown TTS playback backend: {}, falling back to "
+                      "subprocess".format(backend))
+            clazz = SubprocessSink
+        return clazz(config, environment)
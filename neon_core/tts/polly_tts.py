@@ -62,23 +62,29 @@ class PollyTTS(TTS):
                                    aws_secret_access_key=self.key,
                                    region_name=self.region).client('polly')
 
-    def get_tts(self, sentence, wav_file):
+    def _synthesize(self, sentence):
         text_type = "text"
         if self.remove_ssml(sentence) != sentence:
             text_type = "ssml"
             sentence = sentence.replace("\whispered", "/amazon:effect") \
                 .replace("\\whispered", "/amazon:effect") \
                 .replace("whispered", "amazon:effect name=\"whispered\"")
-        response = self.polly.synthesize_speech(
+        return self.polly.synthesize_speech(
             OutputFormat=self.audio_ext,
             Text=sentence,
             TextType=text_type,
             VoiceId=self.voice)
 
+    def get_tts(self, sentence, wav_file):
+        response = self._synthesize(sentence)
         with open(wav_file, 'wb') as f:
             f.write(response['AudioStream'].read())
         return (wav_file, None)  # No phonemes
 
+    def get_tts_stream(self, sentence):
+        response = self._synthesize(sentence)
+        return response['AudioStream'].iter_chunks()
+
     def describe_voices(self, language_code="en-US"):
         if language_code.islower():
             a, b = language_code.split("-")
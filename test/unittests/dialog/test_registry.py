@@ -0,0 +1,104 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from neon_core import dialog
+from neon_core.dialog import DialogRegistry
+
+
+class TestDialogRegistry(unittest.TestCase):
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.res_dir, ignore_errors=True)
+        resolve = patch("neon_core.dialog.resolve_resource_file",
+                        side_effect=self._resolve)
+        resolve.start()
+        self.addCleanup(resolve.stop)
+        self.registry = DialogRegistry(check_interval=60)
+        registry = patch("neon_core.dialog._registry", self.registry)
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def _resolve(self, res_name):
+        path = os.path.join(self.res_dir, res_name)
+        return path if os.path.isfile(path) else None
+
+    def _write(self, phrase, lines, lang="en-us", mtime=None):
+        path = os.path.join(self.res_dir, "text", lang, phrase + ".dialog")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("\n".join(lines))
+        if mtime:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_get_renderer_cached(self):
+        self._write("hello", ["hello {{name}}"])
+        renderer = self.registry.get_renderer("hello", "en-US")
+        self.assertEqual(renderer.templates["hello"], ["hello {name}"])
+        self.assertIs(self.registry.get_renderer("hello", "en-us"), renderer)
+
+    def test_missing_dialog(self):
+        self.assertIsNone(self.registry.get_renderer("missing", "en-us"))
+        self.assertIsNone(self.registry.render("missing", "en-us"))
+        self.assertEqual(dialog.get("missing", "en-us"), "missing")
+        self.assertEqual(dialog.get_all("missing.phrase", "en-us"),
+                         ["missing phrase"])
+
+    def test_reload_changed_file(self):
+        self._write("hello", ["hello"], mtime=1000)
+        renderer = self.registry.get_renderer("hello", "en-us")
+
+        # not checked again within check_interval
+        self._write("hello", ["hi"], mtime=2000)
+        self.assertIs(self.registry.get_renderer("hello", "en-us"), renderer)
+
+        self.registry.check_interval = 0
+        reloaded = self.registry.get_renderer("hello", "en-us")
+        self.assertIsNot(reloaded, renderer)
+        self.assertEqual(reloaded.templates["hello"], ["hi"])
+        # unchanged files keep their renderer
+        self.assertIs(self.registry.get_renderer("hello", "en-us"), reloaded)
+
+    def test_clear(self):
+        self._write("hello", ["hello"])
+        renderer = self.registry.get_renderer("hello", "en-us")
+        self.registry.clear()
+        self.assertIsNot(self.registry.get_renderer("hello", "en-us"),
+                         renderer)
+
+    def test_get(self):
+        self._write("hello", ["hello {{name}}"])
+        self.assertEqual(dialog.get("hello", "en-us", {"name": "neon"}),
+                         "hello neon")
+
+    def test_get_all(self):
+        self._write("cancel", ["cancel {{what}}", "forget {{what}}"])
+        self.assertEqual(dialog.get_all("cancel", "en-us", {"what": "it"}),
+                         ["cancel it", "forget it"])
@@ -0,0 +1,85 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import unittest
+from unittest.mock import patch
+
+from neon_core.processing_modules.text.modules.cancel import Nevermind, \
+    SuffixMatcher
+
+
+class TestSuffixMatcher(unittest.TestCase):
+    def test_match(self):
+        matcher = SuffixMatcher(["cancel that", "that", "forget it"])
+        self.assertEqual(matcher.match("oh cancel that"), (0, "cancel that"))
+        self.assertEqual(matcher.match("not that"), (1, "that"))
+        self.assertEqual(matcher.match("forget it"), (2, "forget it"))
+        self.assertIsNone(matcher.match("cancel that please"))
+        self.assertIsNone(matcher.match(""))
+
+    def test_priority(self):
+        # phrases listed first win, even if a longer phrase matches
+        matcher = SuffixMatcher(["that", "cancel that"])
+        self.assertEqual(matcher.match("cancel that"), (0, "that"))
+
+    def test_duplicates(self):
+        matcher = SuffixMatcher(["forget it", "cancel", "forget it"])
+        self.assertEqual(matcher.match("forget it"), (0, "forget it"))
+
+    def test_empty_phrase(self):
+        matcher = SuffixMatcher(["cancel", ""])
+        self.assertEqual(matcher.match("cancel"), (0, "cancel"))
+        self.assertEqual(matcher.match("anything"), (1, ""))
+
+
+class TestNevermind(unittest.TestCase):
+    def setUp(self):
+        get_all = patch("neon_core.dialog.get_all",
+                        return_value=["cancel that", "forget it"])
+        self.get_all = get_all.start()
+        self.addCleanup(get_all.stop)
+        registry = patch("neon_core.dialog.get_dialog_registry")
+        self.registry = registry.start()
+        self.addCleanup(registry.stop)
+        self.parser = Nevermind()
+
+    def test_parse(self):
+        self.assertEqual(self.parser.parse(["what time is it"]),
+                         (["what time is it"], {}))
+        self.assertEqual(
+            self.parser.parse(["what time is it", "oh forget it",
+                               "cancel that"]),
+            ([], {"canceled": True, "cancel_word": "cancel that"}))
+
+    def test_matcher_rebuilt_on_reload(self):
+        self.parser.parse(["cancel that"])
+        self.parser.parse(["cancel that"])
+        self.assertEqual(self.get_all.call_count, 1)
+        # the registry loaded a changed cancel.dialog
+        self.registry.return_value.get_renderer.return_value = object()
+        self.get_all.return_value = ["never mind"]
+        self.assertEqual(self.parser.parse(["cancel that"]),
+                         (["cancel that"], {}))
+        self.assertEqual(self.parser.parse(["oh never mind"]),
+                         ([], {"canceled": True, "cancel_word": "never mind"}))
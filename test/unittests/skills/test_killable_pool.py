@@ -0,0 +1,159 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import threading
+import time
+import unittest
+
+from neon_core.skills.decorators import AbortEvent, KillableWorkerPool, \
+    get_cancellation_token
+
+
+class TestKillableWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = KillableWorkerPool(max_workers=4, per_skill=1,
+                                       abort_grace=0.1)
+
+    def _skill_stats(self, skill_id):
+        return self.pool.stats()["skills"][skill_id]
+
+    def test_per_skill_queueing(self):
+        release = threading.Event()
+        calls = []
+
+        def handler(name):
+            calls.append(name)
+            release.wait(5)
+
+        first = self.pool.submit(handler, ("first",), {}, "skill_a")
+        second = self.pool.submit(handler, ("second",), {}, "skill_a")
+        other = self.pool.submit(handler, ("other",), {}, "skill_b")
+        time.sleep(0.2)
+        # one running handler per skill, other skills are not blocked
+        self.assertEqual(sorted(calls), ["first", "other"])
+        self.assertEqual(second.state, "queued")
+        stats = self._skill_stats("skill_a")
+        self.assertEqual((stats["running"], stats["queued"]), (1, 1))
+
+        release.set()
+        for task in (first, second, other):
+            self.assertTrue(task.join(5))
+        self.assertEqual(calls, ["first", "other", "second"])
+        stats = self._skill_stats("skill_a")
+        self.assertEqual(stats["completed"], 2)
+        self.assertEqual((stats["running"], stats["queued"]), (0, 0))
+
+    def test_worker_per_ready_handler(self):
+        self.assertTrue(self.pool.submit(len, ((),), {}, "skill_a").join(5))
+        self.assertEqual(self.pool.stats()["idle"], 1)
+
+        release = threading.Event()
+        started = {"skill_a": threading.Event(),
+                   "skill_b": threading.Event()}
+
+        def handler(skill_id):
+            started[skill_id].set()
+            release.wait(5)
+
+        # submitted back to back while a single worker is idle
+        tasks = [self.pool.submit(handler, (skill_id,), {}, skill_id)
+                 for skill_id in started]
+        for event in started.values():
+            self.assertTrue(event.wait(2))
+        self.assertEqual(self.pool.stats()["workers"], 2)
+
+        release.set()
+        for task in tasks:
+            self.assertTrue(task.join(5))
+        self.assertEqual(self.pool.stats()["idle"], 2)
+
+    def test_discard(self):
+        release = threading.Event()
+        calls = []
+        done = []
+        running = self.pool.submit(release.wait, (5,), {}, "skill_a")
+        queued = self.pool.submit(calls.append, ("queued",), {}, "skill_a")
+        queued.add_done_callback(done.append)
+
+        self.assertTrue(self.pool.discard(queued))
+        self.assertEqual(queued.state, "aborted")
+        self.assertFalse(queued.is_alive())
+        self.assertEqual(done, [queued])
+        # running tasks can't be discarded
+        time.sleep(0.1)
+        self.assertFalse(self.pool.discard(running))
+
+        release.set()
+        self.assertTrue(running.join(5))
+        self.assertEqual(calls, [])
+        stats = self._skill_stats("skill_a")
+        self.assertEqual((stats["aborted"], stats["completed"]), (1, 1))
+
+    def test_cooperative_cancel(self):
+        started = threading.Event()
+
+        def handler():
+            token = get_cancellation_token()
+            started.set()
+            while not token.wait(0.01):
+                pass
+
+        task = self.pool.submit(handler, (), {}, "skill_a")
+        self.assertTrue(started.wait(5))
+        self.assertIsNone(get_cancellation_token())
+        task.abort()
+        self.assertFalse(task.is_alive())
+        self.assertEqual(task.state, "aborted")
+        self.assertEqual(self._skill_stats("skill_a")["aborted"], 1)
+        self.assertNotIn("completed", self._skill_stats("skill_a"))
+
+    def test_forced_kill(self):
+        started = threading.Event()
+
+        def handler():
+            started.set()
+            while True:
+                time.sleep(0.01)
+
+        task = self.pool.submit(handler, (), {}, "skill_a", AbortEvent)
+        self.assertTrue(started.wait(5))
+        task.kill()
+        self.assertTrue(task.join(5))
+        self.assertEqual(task.state, "aborted")
+        # the worker survives and runs the next handler
+        calls = []
+        self.assertTrue(self.pool.submit(calls.append, (1,), {},
+                                         "skill_a").join(5))
+        self.assertEqual(calls, [1])
+        stats = self._skill_stats("skill_a")
+        self.assertEqual((stats["aborted"], stats["completed"]), (1, 1))
+
+    def test_failed(self):
+        def handler():
+            raise ValueError("handler error")
+
+        task = self.pool.submit(handler, (), {}, "skill_a")
+        self.assertTrue(task.join(5))
+        self.assertEqual(task.state, "failed")
+        self.assertEqual(self._skill_stats("skill_a")["failed"], 1)
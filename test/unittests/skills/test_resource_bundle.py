@@ -0,0 +1,171 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from os.path import join
+from unittest.mock import patch
+
+from mycroft.skills.skill_data import load_regex, load_vocabulary
+
+from neon_core.dialog import load_dialogs
+from neon_core.skills import resource_bundle
+from neon_core.skills.resource_bundle import BUNDLE_VERSION, build_bundle, \
+    get_bundle_path, load_bundle
+
+SKILL_ID = "test-skill.neon"
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class TestResourceBundle(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.skill_dir = join(self.tmp, "skill")
+        _write(join(self.skill_dir, "dialog", "en-us", "greeting.dialog"),
+               "hello {name}\nhi {name}\n")
+        _write(join(self.skill_dir, "vocab", "en-us", "Weather.voc"),
+               "weather\nforecast\n")
+        _write(join(self.skill_dir, "regex", "en-us", "location.rx"),
+               "in (?P<Location>.*)\n")
+        patcher = patch.object(resource_bundle, "get_bundle_dir",
+                               return_value=join(self.tmp, "bundles"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _lang_dir(self, res_dirname):
+        return join(self.skill_dir, res_dirname, "en-us")
+
+    def _touch(self, path, offset=10):
+        # mtimes of files written within a test may be equal
+        mtime = os.path.getmtime(path) + offset
+        os.utime(path, (mtime, mtime))
+
+    def test_round_trip(self):
+        build_bundle(self.skill_dir, SKILL_ID, "en-us")
+        with patch.object(resource_bundle, "build_bundle") as build:
+            bundle = load_bundle(self.skill_dir, SKILL_ID, "en-us")
+            build.assert_not_called()
+        self.assertEqual(bundle["dialog"],
+                         load_dialogs(self._lang_dir("dialog")).templates)
+        self.assertEqual(bundle["vocab"],
+                         load_vocabulary(self._lang_dir("vocab"), SKILL_ID))
+        self.assertEqual(bundle["regex"],
+                         load_regex(self._lang_dir("regex"), SKILL_ID))
+        self.assertTrue(bundle["vocab"])
+        self.assertTrue(bundle["regex"])
+
+    def test_locale_directory(self):
+        shutil.rmtree(join(self.skill_dir, "vocab"))
+        _write(join(self.skill_dir, "locale", "en-us", "Rain.voc"), "rain\n")
+        bundle = load_bundle(self.skill_dir, SKILL_ID, "en-us")
+        self.assertEqual(bundle["vocab"], load_vocabulary(
+            join(self.skill_dir, "locale", "en-us"), SKILL_ID))
+
+    def test_missing_resources(self):
+        bundle = load_bundle(self.skill_dir, SKILL_ID, "de-de")
+        self.assertEqual((bundle["dialog"], bundle["vocab"], bundle["regex"]),
+                         (None, {}, []))
+
+    def test_rebuild_on_change(self):
+        load_bundle(self.skill_dir, SKILL_ID, "en-us")
+        voc = join(self._lang_dir("vocab"), "Weather.voc")
+        _write(voc, "weather\nforecast\ntemperature\n")
+        self._touch(voc)
+        bundle = load_bundle(self.skill_dir, SKILL_ID, "en-us")
+        self.assertEqual(bundle["vocab"],
+                         load_vocabulary(self._lang_dir("vocab"), SKILL_ID))
+
+        # unchecked bundles are used as they are
+        _write(voc, "weather\n")
+        self._touch(voc, 20)
+        bundle = load_bundle(self.skill_dir, SKILL_ID, "en-us",
+                             check_sources=False)
+        self.assertNotEqual(bundle["vocab"],
+                            load_vocabulary(self._lang_dir("vocab"),
+                                            SKILL_ID))
+
+    def test_rebuild_on_new_file(self):
+        load_bundle(self.skill_dir, SKILL_ID, "en-us")
+        _write(join(self._lang_dir("dialog"), "goodbye.dialog"), "bye\n")
+        self._touch(self._lang_dir("dialog"))
+        bundle = load_bundle(self.skill_dir, SKILL_ID, "en-us")
+        self.assertIn("goodbye", bundle["dialog"])
+
+    def test_rebuild_on_new_resource_dir(self):
+        shutil.rmtree(join(self.skill_dir, "regex"))
+        self.assertEqual(load_bundle(self.skill_dir, SKILL_ID,
+                                     "en-us")["regex"], [])
+        _write(join(self._lang_dir("regex"), "location.rx"),
+               "in (?P<Location>.*)\n")
+        bundle = load_bundle(self.skill_dir, SKILL_ID, "en-us")
+        self.assertEqual(bundle["regex"],
+                         load_regex(self._lang_dir("regex"), SKILL_ID))
+
+    def _load_modified(self, **changes):
+        path = get_bundle_path(self.skill_dir, SKILL_ID, "en-us")
+        bundle = build_bundle(self.skill_dir, SKILL_ID, "en-us")
+        bundle.update(changes, vocab={})
+        with open(path, "w") as f:
+            json.dump(bundle, f)
+        return load_bundle(self.skill_dir, SKILL_ID, "en-us")
+
+    def test_reject_other_skill(self):
+        bundle = self._load_modified(skill_id="other-skill")
+        self.assertEqual(bundle["skill_id"], SKILL_ID)
+        self.assertTrue(bundle["vocab"])
+
+    def test_reject_other_version(self):
+        bundle = self._load_modified(version=BUNDLE_VERSION + 1)
+        self.assertEqual(bundle["version"], BUNDLE_VERSION)
+        self.assertTrue(bundle["vocab"])
+
+    def test_reject_invalid_file(self):
+        path = get_bundle_path(self.skill_dir, SKILL_ID, "en-us")
+        _write(path, "{")
+        self.assertTrue(load_bundle(self.skill_dir, SKILL_ID,
+                                    "en-us")["vocab"])
+        with open(path) as f:
+            self.assertEqual(json.load(f)["skill_id"], SKILL_ID)
+
+    def test_bundle_path(self):
+        other_dir = join(self.tmp, "other", "skill")
+        self.assertNotEqual(get_bundle_path(self.skill_dir, SKILL_ID, "en-us"),
+                            get_bundle_path(other_dir, SKILL_ID, "en-us"))
+        self.assertNotEqual(get_bundle_path(self.skill_dir, SKILL_ID, "en-us"),
+                            get_bundle_path(self.skill_dir, SKILL_ID, "de-de"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,245 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock, local
+import unittest
+
+from mycroft.messagebus.message import Message
+
+from neon_core.skills.intent_service import NeonIntentService
+from neon_core.skills.sessions import DEFAULT_SESSION, SessionDispatcher, \
+    get_session_id
+
+
+class ConverseBus:
+    """Bus answering converse requests with the scripted responses of the
+    requested skill, preceded by responses of other skills and sessions."""
+    def __init__(self):
+        self.handlers = {}
+        self.responses = []
+
+    def on(self, msg_type, handler):
+        self.handlers.setdefault(msg_type, []).append(handler)
+
+    def remove(self, msg_type, handler):
+        self.handlers[msg_type].remove(handler)
+
+    def emit(self, message):
+        if message.msg_type != "skill.converse.request":
+            return
+        for data, context in self.responses:
+            response = Message("skill.converse.response", data, context)
+            for handler in list(self.handlers.get(response.msg_type, [])):
+                handler(response)
+
+
+def _get_service(bus=None, timeout=3600):
+    service = NeonIntentService.__new__(NeonIntentService)
+    service.bus = bus
+    service._sessions = {}
+    service._sessions_lock = Lock()
+    service._session_local = local()
+    service.session_key = "session"
+    service.session_timeout = timeout
+    service.converse_config = {}
+    return service
+
+
+class TestNeonIntentServiceConverse(unittest.TestCase):
+    def setUp(self):
+        self.bus = ConverseBus()
+        self.service = _get_service(self.bus)
+        self.message = Message("recognizer_loop:utterance",
+                               context={"session": "a"})
+
+    def test_ignores_responses_of_other_sessions(self):
+        self.bus.responses = [
+            ({"skill_id": "skill", "result": True}, {"session": "b"}),
+            ({"skill_id": "skill", "result": False}, {"session": "a"})]
+        self.assertFalse(self.service.do_converse(["hi"], "skill", "en-us",
+                                                  self.message))
+
+    def test_ignores_responses_of_other_skills(self):
+        self.bus.responses = [
+            ({"skill_id": "other", "result": False}, {"session": "a"}),
+            ({"skill_id": "skill", "result": True}, {"session": "a"})]
+        self.assertTrue(self.service.do_converse(["hi"], "skill", "en-us",
+                                                 self.message))
+        self.assertEqual(self.bus.handlers["skill.converse.response"], [])
+
+    def test_error_removes_skill_of_the_session(self):
+        self.service._get_session("a").active_skills = [["skill", 0]]
+        self.service._get_session("b").active_skills = [["skill", 0]]
+        self.bus.responses = [
+            ({"skill_id": "skill", "error": "skill id does not exist"}, {"session": "a"})]
+        self.assertFalse(self.service.do_converse(["hi"], "skill", "en-us",
+                                                  self.message))
+        self.assertEqual(self.service._get_session("a").active_skills, [])
+        self.assertEqual(self.service._get_session("b").active_skills,
+                         [["skill", 0]])
+
+
+class TestSessionDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher = SessionDispatcher(max_workers=4)
+
+    def tearDown(self):
+        self.dispatcher.shutdown(wait=True)
+
+    def _wait_idle(self, timeout=5):
+        end = time.time() + timeout
+        while self.dispatcher.pending and time.time() < end:
+            time.sleep(0.01)
+        self.assertEqual(self.dispatcher.pending, {})
+
+    def test_session_order(self):
+        handled = []
+
+        def handle(index):
+            # later tasks finish faster, order is only kept by the dispatcher
+            time.sleep(0.01 * (5 - index))
+            handled.append(index)
+
+        for i in range(5):
+            self.dispatcher.submit("a", handle, i)
+        self._wait_idle()
+        self.assertEqual(handled, list(range(5)))
+
+    def test_sessions_run_concurrently(self):
+        started = {"a": Event(), "b": Event()}
+        release = Event()
+
+        def handle(session):
+            started[session].set()
+            release.wait(5)
+
+        self.dispatcher.submit("a", handle, "a")
+        self.dispatcher.submit("b", handle, "b")
+        self.assertTrue(started["a"].wait(2))
+        self.assertTrue(started["b"].wait(2))
+        self.assertEqual(self.dispatcher.pending, {"a": 1, "b": 1})
+        release.set()
+        self._wait_idle()
+
+    def test_session_waits_for_running_task(self):
+        release = Event()
+        handled = []
+
+        def block():
+            release.wait(5)
+            handled.append("first")
+
+        self.dispatcher.submit("a", block)
+        self.dispatcher.submit("a", handled.append, "second")
+        self.assertEqual(self.dispatcher.pending, {"a": 2})
+        time.sleep(0.05)
+        self.assertEqual(handled, [])
+        release.set()
+        self._wait_idle()
+        self.assertEqual(handled, ["first", "second"])
+
+    def test_failed_task_continues_session(self):
+        handled = []
+
+        def fail():
+            raise RuntimeError("failed")
+
+        self.dispatcher.submit("a", fail)
+        self.dispatcher.submit("a", handled.append, "next")
+        self._wait_idle()
+        self.assertEqual(handled, ["next"])
+
+
+class TestSessions(unittest.TestCase):
+    def test_get_session_id(self):
+        self.assertEqual(get_session_id(None), DEFAULT_SESSION)
+        self.assertEqual(get_session_id(Message("test")), DEFAULT_SESSION)
+        self.assertEqual(get_session_id(Message("test", context={
+            "session": "a"})), "a")
+        self.assertEqual(get_session_id(Message("test", context={
+            "session": {"session_id": 1}})), "1")
+        self.assertEqual(get_session_id(Message("test", context={
+            "client": "b"}), "client"), "b")
+
+    def test_sessions_are_separate(self):
+        service = _get_service()
+        service._get_session("a").active_skills.append(["skill", 0])
+        self.assertEqual(service._get_session("b").active_skills, [])
+        with service._session_scope(Message("test",
+                                            context={"session": "a"})):
+            self.assertEqual(service.active_skills, [["skill", 0]])
+        self.assertEqual(service.active_skills, [])
+
+    def test_prune_expired_sessions(self):
+        service = _get_service(timeout=60)
+        for session_id in ("old", "recent", DEFAULT_SESSION):
+            service._get_session(session_id)
+        service._sessions["old"].last_used = time.time() - 120
+        service._sessions[DEFAULT_SESSION].last_used = time.time() - 120
+        service._get_session("new")
+        self.assertEqual(set(service._sessions),
+                         {"recent", "new", DEFAULT_SESSION})
+
+    def test_used_session_is_kept(self):
+        service = _get_service(timeout=60)
+        service._get_session("a").last_used = time.time() - 120
+        # using a session refreshes it before other sessions are pruned
+        service._get_session("a")
+        service._get_session("new")
+        self.assertIn("a", service._sessions)
+
+
+class TestUtteranceBatch(unittest.TestCase):
+    def test_entries_get_own_context(self):
+        service = _get_service()
+        service._session_dispatcher = None
+        service._batch_executor = ThreadPoolExecutor(max_workers=2)
+        handled = []
+
+        def prepare(message):
+            utterance = message.data["utterances"][0]
+            message.context["timing"]["parsers"] = {utterance: 1}
+            return True
+
+        service._prepare_utterance = prepare
+        service._handle_prepared_utterance = handled.append
+        batch = Message("recognizer_loop:utterance.batch", {"messages": [
+            {"data": {"utterances": ["one"]}, "context": {"session": "a"}},
+            {"data": {"utterances": ["two"]}, "context": {"session": "b"}}
+        ]}, {"timing": {"transcribed": 1}})
+        service.handle_utterance_batch(batch)
+        service._batch_executor.shutdown()
+
+        self.assertEqual([m.context for m in handled], [
+            {"session": "a", "timing": {"transcribed": 1,
+                                        "parsers": {"one": 1}}},
+            {"session": "b", "timing": {"transcribed": 1,
+                                        "parsers": {"two": 1}}}])
+        self.assertEqual(batch.context, {"timing": {"transcribed": 1}})
+
+
+if __name__ == '__main__':
+    unittest.main()
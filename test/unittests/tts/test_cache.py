@@ -0,0 +1,109 @@
+# # NEON AI (TM) SOFTWARE, Software Development Kit & Application Development System
+# # All trademark and other rights reserved by their respective owners
+# # Copyright 2008-2021 Neongecko.com Inc.
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import os
+import shutil
+import tempfile
+import unittest
+
+from neon_core.tts.cache import TTSCache
+
+
+class TestTTSCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+
+    def _add(self, cache, key, size=10, phonemes=False):
+        with open(cache.audio_path(key), "wb") as f:
+            f.write(b"0" * size)
+        if phonemes:
+            with open(cache.phonemes_path(key), "w") as f:
+                f.write("HH 0.1")
+        cache.add(key)
+
+    def test_key_prefix(self):
+        key = TTSCache.get_key("hello", "mimic", voice="ap")
+        self.assertTrue(key.startswith("ap."))
+        key = TTSCache.get_key("hello", "mimic")
+        self.assertTrue(key.startswith("default."))
+        self.assertEqual(
+            TTSCache.get_key("< speak >hello  world</speak>", "mimic"),
+            TTSCache.get_key("<speak>hello world</speak>", "mimic"))
+        self.assertNotEqual(TTSCache.get_key("hello", "mimic", voice="ap"),
+                            TTSCache.get_key("hello", "mimic", voice="kal"))
+
+    def test_hit_miss_stats(self):
+        cache = TTSCache(self.cache_dir)
+        self.assertIsNone(cache.get("default.a"))
+        self._add(cache, "default.a")
+        self.assertEqual(cache.get("default.a"),
+                         os.path.join(self.cache_dir, "default.a.wav"))
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["size"], 10)
+
+    def test_evict_entries(self):
+        cache = TTSCache(self.cache_dir, max_entries=2)
+        self._add(cache, "default.a", phonemes=True)
+        self._add(cache, "default.b")
+        cache.get("default.a")  # b is now least recently used
+        self._add(cache, "default.c")
+        self.assertEqual(len(cache), 2)
+        self.assertIn("default.a", cache)
+        self.assertNotIn("default.b", cache)
+        self.assertFalse(os.path.exists(cache.audio_path("default.b")))
+        self.assertTrue(os.path.exists(cache.phonemes_path("default.a")))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_evict_size(self):
+        cache = TTSCache(self.cache_dir, max_size=25)
+        self._add(cache, "default.a", phonemes=True)
+        self._add(cache, "default.b")
+        self._add(cache, "default.c")
+        self.assertNotIn("default.a", cache)
+        self.assertFalse(os.path.exists(cache.phonemes_path("default.a")))
+        self.assertEqual(cache.stats()["size"], 20)
+
+    def test_load_existing(self):
+        cache = TTSCache(self.cache_dir)
+        self._add(cache, "default.a", size=5)
+        self._add(cache, "default.b", size=7)
+        cache = TTSCache(self.cache_dir)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats()["size"], 12)
+
+    def test_clear_voice(self):
+        cache = TTSCache(self.cache_dir)
+        self._add(cache, "ap.a", phonemes=True)
+        self._add(cache, "kal.b")
+        cache.invalidate("ap")
+        self.assertNotIn("ap.a", cache)
+        self.assertIn("kal.b", cache)
+        self.assertEqual(os.listdir(self.cache_dir), ["kal.b.wav"])
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(os.listdir(self.cache_dir), [])